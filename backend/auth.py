@@ -2,36 +2,86 @@
 Authentication module for Iris backend.
 """
 
+import hashlib
+import time
+from cachetools import TTLCache
 from fastapi import HTTPException, Depends, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
-from services.supabase_client import get_db_connection
-from utils.auth_utils import verify_and_get_user_id_from_jwt
+from typing import Tuple
+from services.supabase_client import get_app_client
+from utils.auth_utils import decode_jwt_claims, verify_and_authorize_thread_access
 
 security = HTTPBearer()
 
-async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
-    """Get current authenticated user."""
+# Verified tokens: sha256(token)[:16] -> (user_id, exp)
+_jwt_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+
+# user_id -> role, shared by every verify_role dependency
+_role_cache: TTLCache = TTLCache(maxsize=50000, ttl=60)
+_ROLE_HIERARCHY = {'user': 0, 'admin': 1, 'super_admin': 2}
+
+# (user_id, thread_id) pairs whose ownership was confirmed recently
+_thread_access_cache: TTLCache = TTLCache(maxsize=100000, ttl=60)
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()[:16]
+
+def get_token_identity(token: str) -> Tuple[str, float]:
+    """Resolve a raw JWT to (user_id, exp) through the verification cache."""
+    key = _token_cache_key(token)
+    
+    cached = _jwt_cache.get(key)
+    if cached is not None and cached[1] > time.time():
+        return cached
+    
+    # One decode on a miss yields both the user ID and the expiry
     try:
-        user_id = await verify_and_get_user_id_from_jwt(request)
-        return {"user_id": user_id, "token": credentials.credentials}
+        claims = decode_jwt_claims(token)
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid authentication")
+    
+    user_id = claims["sub"]
+    # Tokens without an exp claim are still bounded by the cache TTL
+    exp = float(claims["exp"]) if claims.get("exp") is not None else float("inf")
+    if exp <= time.time():
+        raise HTTPException(status_code=401, detail="Token expired")
+    _jwt_cache[key] = (user_id, exp)
+    return user_id, exp
+
+def get_user_id_from_token(token: str) -> str:
+    """Resolve a raw JWT to its user ID through the verification cache."""
+    return get_token_identity(token)[0]
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
+    """Get current authenticated user."""
+    token = credentials.credentials
+    return {"user_id": get_user_id_from_token(token), "token": token}
+
+async def authorize_thread_access(client, thread_id: str, user_id: str) -> None:
+    """Check thread ownership, skipping the database for pairs confirmed recently."""
+    key = (user_id, thread_id)
+    if key in _thread_access_cache:
+        return
+    await verify_and_authorize_thread_access(client, thread_id, user_id)
+    _thread_access_cache[key] = True
 
 def verify_role(required_role: str):
     """Verify user has required role."""
-    async def role_checker(user: dict = Depends(get_current_user)) -> dict:
-        db = get_db_connection()
-        client = await db.client
-        result = await client.table('user_roles').select('role').eq('user_id', user['user_id']).execute()
-        
-        if not result.data or len(result.data) == 0:
-            raise HTTPException(status_code=403, detail="No role assigned")
-        
-        user_role = result.data[0]['role']
-        role_hierarchy = {'user': 0, 'admin': 1, 'super_admin': 2}
+    required_level = _ROLE_HIERARCHY.get(required_role, 999)
+    
+    async def role_checker(request: Request, user: dict = Depends(get_current_user)) -> dict:
+        user_role = _role_cache.get(user['user_id'])
+        if user_role is None:
+            client = await get_app_client(request.app)
+            result = await client.table('user_roles').select('role').eq('user_id', user['user_id']).execute()
+            
+            if not result.data or len(result.data) == 0:
+                raise HTTPException(status_code=403, detail="No role assigned")
+            
+            user_role = result.data[0]['role']
+            _role_cache[user['user_id']] = user_role
         
-        if role_hierarchy.get(user_role, -1) < role_hierarchy.get(required_role, 999):
+        if _ROLE_HIERARCHY.get(user_role, -1) < required_level:
             raise HTTPException(status_code=403, detail=f"Requires {required_role} role")
         
         user['role'] = user_role
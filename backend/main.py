@@ -1,15 +1,18 @@
 # Iris Backend Main Application - Ultra Fast Agentic AI
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response, ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import os
 import time
-import json
+import orjson
+import msgpack
 import asyncio
-import uuid
-from datetime import datetime, timezone
+import base64
+import queue
+import logging
+import logging.handlers
 from dotenv import load_dotenv
 
 # Load environment variables from root directory
@@ -21,14 +24,18 @@ from services.tool_executor import get_tool_executor
 from services.orchestrator import get_orchestrator
 from utils.redis_client import get_redis_client, JobStatus
 from tools import get_tool_schemas
-from auth import get_current_user
+from auth import get_current_user, get_token_identity, authorize_thread_access
 from threads import router as threads_router
+from services.supabase_client import get_app_client, get_db_connection
+from services.daytona_client import get_daytona_client
+from services.firecrawl_client import get_firecrawl_client
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Iris Agentic AI API",
     description="Ultra-fast agentic AI system with real-time streaming and multi-tool execution",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend
@@ -43,6 +50,44 @@ app.add_middleware(
 # Include routers
 app.include_router(threads_router, prefix="/api", tags=["threads"])
 
+# WebSocket logging goes through a queue so stream writes happen off the event loop
+logger = logging.getLogger("iris.ws")
+logger.setLevel(os.getenv("WS_LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+
+# Resolve shared clients once at startup instead of per request
+@app.on_event("startup")
+async def startup_event():
+    _log_listener.start()
+    app.state.gemini = get_gemini_client()
+    if app.state.gemini.api_key_configured:
+        app.state.gemini.register_tools(_TOOL_SCHEMAS)
+    # Warm the Gemini connection in the background; held so it isn't collected
+    app.state.gemini_prewarm = asyncio.create_task(app.state.gemini.prewarm())
+    app.state.tool_executor = get_tool_executor()
+    app.state.orchestrator = get_orchestrator()
+    app.state.redis = get_redis_client()
+    app.state.daytona = get_daytona_client()
+    await app.state.daytona.start_warm_pool()
+    
+    try:
+        app.state.supabase = await get_db_connection().client
+    except Exception as e:
+        # Anonymous chat works without Supabase; authenticated paths retry lazily
+        logger.warning("Supabase client not available at startup: %s", e)
+        app.state.supabase = None
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_firecrawl_client().aclose()
+    await get_daytona_client().aclose()
+    _log_listener.stop()
+
 # Pydantic models
 class Message(BaseModel):
     content: str
@@ -69,58 +114,184 @@ class JobStatusResponse(BaseModel):
     created_at: float
     updated_at: float
 
+def _dumps(obj: Any) -> str:
+    """Serialize with orjson; non-str keys are allowed as with json.dumps"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def _json_response(payload: Any) -> Response:
+    """Return pre-serialized JSON, skipping FastAPI's jsonable_encoder pass"""
+    return Response(content=orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS), media_type="application/json")
+
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+def _sse(obj: Any) -> bytes:
+    """Encode one server-sent event line as bytes"""
+    return _SSE_PREFIX + orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) + _SSE_SUFFIX
+
+# X-Accel-Buffering stops nginx-style proxies from holding events back
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+    "Access-Control-Allow-Origin": "*"
+}
+
+# Text chunks dominate streams; only their content needs encoding
+_SSE_TEXT_PREFIX = b'data: {"type":"text","content":'
+_SSE_TEXT_SUFFIX = b'}\n\n'
+
+def _sse_text(content: str) -> bytes:
+    """Encode a text event without building its dict"""
+    return _SSE_TEXT_PREFIX + orjson.dumps(content) + _SSE_TEXT_SUFFIX
+
+# Binary file transfer limits
+FILE_CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+
+# Window for coalescing streamed WebSocket events into one frame
+WS_FLUSH_INTERVAL_MS = float(os.getenv("WS_FLUSH_INTERVAL_MS", "5"))
+
 # WebSocket connection manager
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+    # Event types that skip the batching window
+    FLUSH_NOW_TYPES = {"done", "error", "tool_result"}
+
+    def __init__(self, flush_interval: float = 0.005, max_pending: int = 64):
+        # thread_id -> (socket, lock serializing writes to it, frame codec)
+        self.active_connections: Dict[str, Tuple[WebSocket, asyncio.Lock, str]] = {}
+        self.pending_events: Dict[str, List[dict]] = {}
+        self.flush_tasks: Dict[str, asyncio.Task] = {}
+        self.last_flush: Dict[str, float] = {}
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
 
-    async def connect(self, websocket: WebSocket, thread_id: str):
+    async def connect(self, websocket: WebSocket, thread_id: str, codec: str = "json"):
+        """Accept a socket; codec "msgpack" sends events as binary msgpack frames"""
         await websocket.accept()
-        self.active_connections[thread_id] = websocket
+        self.active_connections[thread_id] = (websocket, asyncio.Lock(), codec)
 
     def disconnect(self, thread_id: str):
-        if thread_id in self.active_connections:
-            del self.active_connections[thread_id]
+        self.active_connections.pop(thread_id, None)
+        task = self.flush_tasks.pop(thread_id, None)
+        if task is not None:
+            task.cancel()
+        self.pending_events.pop(thread_id, None)
+        self.last_flush.pop(thread_id, None)
+
+    @staticmethod
+    async def _send(websocket: WebSocket, codec: str, message: dict):
+        if codec == "msgpack":
+            await websocket.send_bytes(msgpack.packb(message, use_bin_type=True))
+        else:
+            await websocket.send_text(_dumps(message))
 
     async def send_message(self, thread_id: str, message: dict):
-        if thread_id in self.active_connections:
-            websocket = self.active_connections[thread_id]
-            try:
-                await websocket.send_json(message)
-            except Exception:
-                self.disconnect(thread_id)
+        connection = self.active_connections.get(thread_id)
+        if connection is None:
+            return
+        websocket, lock, codec = connection
+        try:
+            async with lock:
+                await self._send(websocket, codec, message)
+        except Exception:
+            self.disconnect(thread_id)
+
+    async def send_file(self, thread_id: str, begin: dict, content: bytes, end: dict):
+        """Send begin, the content as FILE_CHUNK_SIZE binary frames, then end
+        
+        The lock is held throughout so no other event lands between chunks.
+        With the msgpack codec events are binary frames too, so each chunk is
+        sent as a {"type": "file_chunk", "data": bytes} event instead of raw.
+        """
+        connection = self.active_connections.get(thread_id)
+        if connection is None:
+            return
+        websocket, lock, codec = connection
+        view = memoryview(content)
+        try:
+            async with lock:
+                await self._send(websocket, codec, begin)
+                for offset in range(0, len(content), FILE_CHUNK_SIZE):
+                    chunk = view[offset:offset + FILE_CHUNK_SIZE].tobytes()
+                    if codec == "msgpack":
+                        await self._send(websocket, codec, {"type": "file_chunk", "data": chunk})
+                    else:
+                        await websocket.send_bytes(chunk)
+                await self._send(websocket, codec, end)
+        except Exception:
+            self.disconnect(thread_id)
+
+    async def send_batched(self, thread_id: str, message: dict):
+        """Queue an event and send it with others emitted in the same flush window"""
+        if thread_id not in self.pending_events:
+            # An idle connection sends straight away so the first token isn't delayed
+            now = time.monotonic()
+            if now - self.last_flush.get(thread_id, 0.0) >= self.flush_interval:
+                self.last_flush[thread_id] = now
+                await self.send_message(thread_id, message)
+                return
+        pending = self.pending_events.setdefault(thread_id, [])
+        pending.append(message)
+        # A full batch is sent inline, so a slow client throttles the producer
+        # instead of letting queued events grow without bound
+        if message.get("type") in self.FLUSH_NOW_TYPES or len(pending) >= self.max_pending:
+            await self.flush(thread_id)
+        elif thread_id not in self.flush_tasks:
+            self.flush_tasks[thread_id] = asyncio.create_task(self._flush_later(thread_id))
+
+    async def _flush_later(self, thread_id: str):
+        await asyncio.sleep(self.flush_interval)
+        self.flush_tasks.pop(thread_id, None)
+        await self.flush(thread_id)
+
+    async def flush(self, thread_id: str):
+        """Send all queued events for a thread as a single frame"""
+        task = self.flush_tasks.pop(thread_id, None)
+        if task is not None:
+            task.cancel()
+        events = self.pending_events.pop(thread_id, None)
+        if not events:
+            return
+        self.last_flush[thread_id] = time.monotonic()
+        if len(events) == 1:
+            await self.send_message(thread_id, events[0])
+        else:
+            await self.send_message(thread_id, {"type": "batch", "events": events})
 
-manager = ConnectionManager()
+manager = ConnectionManager(flush_interval=WS_FLUSH_INTERVAL_MS / 1000)
+
+# Constant part of the health payload, encoded once
+_HEALTH_HEAD = b'{"status":"healthy","service":"iris-backend","version":"1.0.0","timestamp":'
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
-    redis_client = get_redis_client()
+    redis_client = request.app.state.redis
     redis_health = await redis_client.health_check()
     
-    return {
-        "status": "healthy", 
-        "service": "iris-backend",
-        "timestamp": time.time(),
-        "redis": redis_health,
-        "version": "1.0.0"
-    }
+    body = _HEALTH_HEAD + orjson.dumps(time.time()) + b',"redis":' + orjson.dumps(redis_health, option=orjson.OPT_NON_STR_KEYS) + b'}'
+    return Response(content=body, media_type="application/json")
+
+# Tool schemas are static, so build and serialize them once at import
+_TOOL_SCHEMAS = get_tool_schemas()
+_TOOL_SCHEMAS_JSON = orjson.dumps({"schemas": _TOOL_SCHEMAS})
 
 # Tool schemas endpoint
 @app.get("/tools/schemas")
 async def get_tools_schemas():
     """Get all available tool schemas for function calling"""
-    return {"schemas": get_tool_schemas()}
+    return Response(content=_TOOL_SCHEMAS_JSON, media_type="application/json")
 
 # Tool execution endpoint
 @app.post("/tools/execute")
-async def execute_tool_endpoint(tool_call: ToolCall):
+async def execute_tool_endpoint(tool_call: ToolCall, request: Request):
     """Execute a tool synchronously or asynchronously"""
     try:
         if tool_call.mode == "async":
             # Create async job
-            redis_client = get_redis_client()
+            redis_client = request.app.state.redis
             job_id = await redis_client.create_job(
                 job_type="tool_execution",
                 parameters={
@@ -134,7 +305,7 @@ async def execute_tool_endpoint(tool_call: ToolCall):
         
         else:
             # Execute synchronously
-            tool_executor = get_tool_executor()
+            tool_executor = request.app.state.tool_executor
             result = await tool_executor.execute_tool_sync(
                 tool_call.tool_name, 
                 tool_call.parameters
@@ -149,54 +320,74 @@ async def execute_tool_endpoint(tool_call: ToolCall):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch tool execution endpoint
+@app.post("/tools/execute/batch")
+async def execute_tools_batch(tool_calls: List[ToolCall], request: Request):
+    """Queue several tool calls as async jobs in a single Redis round-trip"""
+    try:
+        redis_client = request.app.state.redis
+        job_ids = await redis_client.create_jobs([
+            {
+                "job_type": "tool_execution",
+                "parameters": {
+                    "tool_name": tool_call.tool_name,
+                    "parameters": tool_call.parameters
+                },
+                "priority": tool_call.priority
+            }
+            for tool_call in tool_calls
+        ])
+        
+        return {"jobs": [{"job_id": job_id, "status": "queued"} for job_id in job_ids]}
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Job status endpoint
-@app.get("/jobs/{job_id}/status", response_model=JobStatusResponse)
-async def get_job_status(job_id: str):
+@app.get("/jobs/{job_id}/status", response_model=None, responses={200: {"model": JobStatusResponse}})
+async def get_job_status(job_id: str, request: Request):
     """Get job status and result"""
-    redis_client = get_redis_client()
+    redis_client = request.app.state.redis
     job_data = await redis_client.get_job(job_id)
     
     if not job_data:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return JobStatusResponse(
-        job_id=job_id,
-        status=job_data["status"],
-        result=job_data.get("result"),
-        error=job_data.get("error"),
-        created_at=job_data["created_at"],
-        updated_at=job_data["updated_at"]
-    )
+    # The model only documents the shape; the dict is serialized as-is
+    return _json_response({
+        "job_id": job_id,
+        "status": job_data["status"],
+        "result": job_data.get("result"),
+        "error": job_data.get("error"),
+        "created_at": job_data["created_at"],
+        "updated_at": job_data["updated_at"]
+    })
 
 # Job events streaming endpoint
 @app.get("/jobs/{job_id}/events")
-async def stream_job_events(job_id: str):
+async def stream_job_events(job_id: str, request: Request):
     """Stream job events in real-time"""
-    redis_client = get_redis_client()
+    redis_client = request.app.state.redis
     
     async def generate_events():
         try:
             async for event in redis_client.stream_job_events(job_id):
-                yield f"data: {json.dumps(event)}\n\n"
+                yield _sse(event)
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield _sse({'type': 'error', 'message': str(e)})
     
     return StreamingResponse(
         generate_events(),
-        media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*"
-        }
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS
     )
 
 # Simple chat endpoint (instant response)
-@app.post("/chat", response_model=ChatResponse)
-async def chat_simple(message: Message):
+@app.post("/chat", response_model=None, responses={200: {"model": ChatResponse}})
+async def chat_simple(message: Message, request: Request):
     """Simple chat endpoint with instant response"""
     try:
-        gemini_client = get_gemini_client()
+        gemini_client = request.app.state.gemini
         
         # Get instant response
         response = await gemini_client.chat_simple(
@@ -204,114 +395,116 @@ async def chat_simple(message: Message):
             thread_history=None  # TODO: Add thread history from Redis
         )
         
-        return ChatResponse(
-            message=response,
-            thread_id=message.thread_id or "default",
-            status="complete"
-        )
+        return _json_response({
+            "message": response,
+            "tool_calls": None,
+            "thread_id": message.thread_id or "default",
+            "job_id": None,
+            "status": "complete"
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Streaming chat endpoint (SSE)
 @app.post("/chat/stream")
-async def chat_stream(message: Message):
+async def chat_stream(message: Message, request: Request):
     """Streaming chat endpoint with Server-Sent Events"""
+    gemini_client = request.app.state.gemini
+    tool_executor = request.app.state.tool_executor
+    
+    def tool_result_event(call: dict, tool_results: List[dict]) -> bytes:
+        result = tool_results[0]
+        return _sse({'type': 'tool_result', 'name': call['name'], 'result': result.get('result', {'error': result.get('error')})})
     
     async def generate_stream():
+        # Tool calls start as soon as they arrive so several calls in one turn
+        # overlap; results are still emitted in call order
+        pending_tools: List[tuple] = []
         try:
-            gemini_client = get_gemini_client()
-            tool_executor = get_tool_executor()
-            
-            # Get tool schemas
-            tools = get_tool_schemas()
             
             # Stream Gemini response
             async for chunk in gemini_client.chat_with_tools_streaming(
                 message.content, 
-                tools
+                _TOOL_SCHEMAS
             ):
+                # Emit results that have finished, without waiting on slower ones
+                while pending_tools and pending_tools[0][1].done():
+                    call, task = pending_tools.pop(0)
+                    yield tool_result_event(call, task.result())
+                
                 if chunk["type"] == "text":
-                    yield f"data: {json.dumps({'type': 'text', 'content': chunk['content']})}\n\n"
+                    yield _sse_text(chunk['content'])
                 
                 elif chunk["type"] == "tool_call":
-                    # Execute tool immediately
-                    tool_results = await tool_executor.execute_tools_parallel([chunk])
-                    
-                    yield f"data: {json.dumps({'type': 'tool_result', 'name': chunk['name'], 'result': tool_results[0]['result']})}\n\n"
+                    task = asyncio.create_task(tool_executor.execute_tools_parallel([chunk]))
+                    pending_tools.append((chunk, task))
                 
                 elif chunk["type"] == "thinking":
-                    yield f"data: {json.dumps({'type': 'thinking', 'content': chunk['content']})}\n\n"
+                    yield _sse({'type': 'thinking', 'content': chunk['content']})
                 
                 elif chunk["type"] == "error":
-                    yield f"data: {json.dumps({'type': 'error', 'content': chunk['content']})}\n\n"
+                    yield _sse({'type': 'error', 'content': chunk['content']})
+            
+            while pending_tools:
+                call, task = pending_tools.pop(0)
+                yield tool_result_event(call, await task)
         
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            yield _sse({'type': 'error', 'content': str(e)})
+        finally:
+            for _, task in pending_tools:
+                task.cancel()
     
     return StreamingResponse(
         generate_stream(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*"
-        }
+        headers=_SSE_HEADERS
     )
 
 # WebSocket chat endpoint (primary) - P1.5 Instant-or-Agentic
 @app.websocket("/ws/chat/{thread_id}")
 async def websocket_chat(websocket: WebSocket, thread_id: str):
     """WebSocket chat endpoint with P1.5 instant-or-agentic orchestration"""
-    await manager.connect(websocket, thread_id)
+    # Clients opt into binary msgpack event frames with ?codec=msgpack
+    codec = "msgpack" if websocket.query_params.get("codec") == "msgpack" else "json"
+    await manager.connect(websocket, thread_id, codec)
+    expiry_task = None
     
     try:
         # Get auth token from query params (optional)
         token = websocket.query_params.get("token")
         user_id = None
         
-        print(f"🔍 WebSocket query params: {dict(websocket.query_params)}")
-        print(f"🔍 WebSocket token received: {token[:50] if token else 'None'}...")
-        
         # Only verify authentication if token is provided
         if token:
             try:
-                from utils.auth_utils import verify_and_get_user_id_from_jwt
-                from fastapi import Request
-                import jwt
-                
-                # Create a mock request for auth verification
-                class MockRequest:
-                    def __init__(self, token):
-                        self.headers = {"Authorization": f"Bearer {token}"}
-                
-                mock_request = MockRequest(token)
-                user_id = await verify_and_get_user_id_from_jwt(mock_request)
+                # Shares the token cache with the HTTP auth path
+                user_id, token_exp = get_token_identity(token)
                 
                 # Verify user has access to thread
-                from services.supabase_client import get_db_connection
-                from utils.auth_utils import verify_and_authorize_thread_access
-                db = get_db_connection()
-                client = await db.client
+                client = await get_app_client(websocket.app)
                 # Attach user's JWT to PostgREST for RLS evaluation
                 try:
                     client.postgrest.auth(token)
                 except Exception:
                     pass
-                await verify_and_authorize_thread_access(client, thread_id, user_id)
+                await authorize_thread_access(client, thread_id, user_id)
+                
+                # Auth is checked once; the socket is closed when the token expires
+                if token_exp != float("inf"):
+                    expiry_task = asyncio.create_task(_close_at_expiry(websocket, token_exp))
                 
             except Exception as e:
-                print(f"❌ WebSocket authentication error: {str(e)}")
-                print(f"❌ Token that failed: {token[:100] if token else 'None'}...")
+                logger.warning("❌ WebSocket authentication error for thread %s: %s", thread_id, e)
                 await websocket.close(code=1008, reason=f"Authentication failed: {str(e)}")
                 return
         else:
             # No authentication - allow anonymous access
-            print(f"🔓 Anonymous WebSocket connection for thread: {thread_id}")
+            logger.debug("🔓 Anonymous WebSocket connection for thread: %s", thread_id)
             user_id = None
         
-        orchestrator = get_orchestrator()
-        gemini_client = get_gemini_client()
+        orchestrator = websocket.app.state.orchestrator
         
         # Get conversation history from database (only if authenticated)
         conversation_history = []
@@ -327,21 +520,22 @@ async def websocket_chat(websocket: WebSocket, thread_id: str):
                             "timestamp": msg.get("created_at", "")
                         })
             except Exception as e:
-                print(f"Error loading conversation history: {e}")
-        else:
-            print(f"🔓 Anonymous user - no conversation history loaded")
+                logger.error("Error loading conversation history: %s", e)
         
         while True:
             # Receive user message
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
             message_content = data.get("content", "")
             
-            print(f"🔍 Received WebSocket message: {data}")
+            logger.debug("🔍 Received WebSocket message of type %s", data.get("type"))
             
             # Handle file operations (background, no tool calls)
             if data.get("type") == "file_upload":
                 await handle_file_upload(websocket, data, thread_id)
                 continue
+            elif data.get("type") == "file_upload_begin":
+                await handle_file_upload_binary(websocket, data, thread_id)
+                continue
             elif data.get("type") == "file_download":
                 await handle_file_download(websocket, data, thread_id)
                 continue
@@ -350,80 +544,85 @@ async def websocket_chat(websocket: WebSocket, thread_id: str):
                 continue
             
             if not message_content:
-                print("❌ Empty message content, skipping")
+                logger.debug("❌ Empty message content, skipping")
                 continue
             
+            # One clock read per turn, shared by the ack, errors and history
+            now = time.time()
+            
             # Send acknowledgment
             await manager.send_message(thread_id, {
                 "type": "ack",
-                "timestamp": time.time()
+                "timestamp": now
             })
-            print(f"✅ Sent acknowledgment for: {message_content}")
             
             # Save user message to database (only if authenticated)
             if user_id:
                 try:
+                    # message_id and created_at are filled by column defaults
                     await client.table('messages').insert({
-                        "message_id": str(uuid.uuid4()),
                         "thread_id": thread_id,
                         "type": "user",
                         "is_llm_message": True,
-                        "content": {"role": "user", "content": message_content},
-                        "created_at": datetime.now(timezone.utc).isoformat()
+                        "content": {"role": "user", "content": message_content}
                     }).execute()
                 except Exception as e:
-                    print(f"Error saving user message: {e}")
-            else:
-                print(f"🔓 Anonymous user - message not saved to database")
+                    logger.error("Error saving user message: %s", e)
             
             # Process message through orchestrator (instant-or-agentic routing)
+            # Streamed text chunks, saved as one assistant message per turn
+            response_parts = []
+            response_ts = None
             try:
-                print(f"🔄 Starting orchestrator processing for: {message_content}")
                 event_count = 0
                 async for event in orchestrator.process_message(message_content, conversation_history):
                     event_count += 1
-                    print(f"📤 Sending event #{event_count}: {event}")
-                    await manager.send_message(thread_id, event)
+                    await manager.send_batched(thread_id, event)
                     
-                    # Update conversation history for next turn
                     if event["type"] == "text":
-                        conversation_history.append({
-                            "role": "assistant",
-                            "content": event["content"],
-                            "timestamp": event["ts"]
-                        })
-                        
-                        # Save assistant message to database (only if authenticated)
-                        if user_id:
-                            try:
-                                await client.table('messages').insert({
-                                    "message_id": str(uuid.uuid4()),
-                                    "thread_id": thread_id,
-                                    "type": "assistant",
-                                    "is_llm_message": True,
-                                    "content": {"role": "assistant", "content": event["content"]},
-                                    "created_at": datetime.now(timezone.utc).isoformat()
-                                }).execute()
-                            except Exception as e:
-                                print(f"Error saving assistant message: {e}")
+                        if response_ts is None:
+                            response_ts = event["ts"]
+                        response_parts.append(event["content"])
                 
-                print(f"✅ Processed {event_count} events for message: {message_content}")
+                await manager.flush(thread_id)
+                logger.debug("✅ Processed %d events for thread %s", event_count, thread_id)
                 
             except Exception as e:
-                print(f"❌ Error in orchestrator: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error in orchestrator: %s", e)
+                await manager.flush(thread_id)
                 await manager.send_message(thread_id, {
                     "type": "error",
                     "content": f"Error processing message: {str(e)}",
-                    "timestamp": time.time()
+                    "timestamp": now
                 })
             
+            if response_parts:
+                response_text = "".join(response_parts)
+                
+                # Update conversation history for next turn
+                conversation_history.append({
+                    "role": "assistant",
+                    "content": response_text,
+                    "timestamp": response_ts
+                })
+                
+                # Save assistant message to database (only if authenticated)
+                if user_id:
+                    try:
+                        await client.table('messages').insert({
+                            "thread_id": thread_id,
+                            "type": "assistant",
+                            "is_llm_message": True,
+                            "content": {"role": "assistant", "content": response_text}
+                        }).execute()
+                    except Exception as e:
+                        logger.error("Error saving assistant message: %s", e)
+            
             # Add user message to history
             conversation_history.append({
                 "role": "user", 
                 "content": message_content,
-                "timestamp": time.time()
+                "timestamp": now
             })
     
     except WebSocketDisconnect:
@@ -435,31 +634,43 @@ async def websocket_chat(websocket: WebSocket, thread_id: str):
             "timestamp": time.time()
         })
         manager.disconnect(thread_id)
+    finally:
+        if expiry_task is not None:
+            expiry_task.cancel()
+
+async def _close_at_expiry(websocket: WebSocket, exp: float):
+    """Close an authenticated socket once its token's exp has passed"""
+    await asyncio.sleep(max(0.0, exp - time.time()))
+    try:
+        await websocket.close(code=1008, reason="Token expired")
+    except Exception:
+        pass
 
 # Performance stats endpoint
 @app.get("/stats")
-async def get_performance_stats():
+async def get_performance_stats(request: Request):
     """Get system performance statistics"""
-    gemini_client = get_gemini_client()
-    tool_executor = get_tool_executor()
-    orchestrator = get_orchestrator()
-    redis_client = get_redis_client()
+    state = request.app.state
+    gemini_client = state.gemini
+    tool_executor = state.tool_executor
+    orchestrator = state.orchestrator
+    redis_client = state.redis
     
-    return {
+    return _json_response({
         "gemini": gemini_client.get_performance_stats(),
         "tools": tool_executor.get_performance_stats(),
         "orchestrator": orchestrator.get_stats(),
         "redis": redis_client.get_stats(),
         "websocket_connections": len(manager.active_connections),
         "timestamp": time.time()
-    }
+    })
 
 # Title generation endpoint
 @app.post("/chat/title")
-async def generate_chat_title(message: Message):
+async def generate_chat_title(message: Message, request: Request):
     """Generate a chat title using Gemini Flash Lite"""
     try:
-        gemini_client = get_gemini_client()
+        gemini_client = request.app.state.gemini
         title = await gemini_client.generate_chat_title(message.content)
         
         return {"title": title, "thread_id": message.thread_id or "default"}
@@ -467,20 +678,6 @@ async def generate_chat_title(message: Message):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Thread management endpoints
-@app.get("/threads/{thread_id}/messages")
-async def get_messages(thread_id: str):
-    """Get conversation history for a thread"""
-    # TODO: Implement with Redis storage
-    return {"messages": [], "thread_id": thread_id}
-
-@app.post("/threads")
-async def create_thread():
-    """Create a new conversation thread"""
-    thread_id = str(uuid.uuid4())
-    # TODO: Store thread in Redis
-    return {"thread_id": thread_id}
-
 # File operation handlers (background operations, no tool calls)
 async def handle_file_upload(websocket: WebSocket, data: dict, thread_id: str):
     """Handle file upload to sandbox - background operation"""
@@ -498,7 +695,6 @@ async def handle_file_upload(websocket: WebSocket, data: dict, thread_id: str):
             return
         
         # Decode base64 content
-        import base64
         try:
             decoded_content = base64.b64decode(file_content)
         except Exception as e:
@@ -509,11 +705,10 @@ async def handle_file_upload(websocket: WebSocket, data: dict, thread_id: str):
             return
         
         # Upload to sandbox using Daytona client
-        from services.daytona_client import get_daytona_client
-        daytona_client = get_daytona_client()
+        daytona_client = websocket.app.state.daytona
         
         sandbox_path = f"/workspace/{file_name}"
-        result = await daytona_client.write_file(sandbox_path, decoded_content.decode('utf-8', errors='ignore'))
+        result = await daytona_client.write_file(sandbox_path, decoded_content)
         
         if result.get("success"):
             await manager.send_message(thread_id, {
@@ -535,8 +730,81 @@ async def handle_file_upload(websocket: WebSocket, data: dict, thread_id: str):
             "error": f"File upload failed: {str(e)}"
         })
 
+async def handle_file_upload_binary(websocket: WebSocket, data: dict, thread_id: str):
+    """Handle file upload sent as raw binary frames after a file_upload_begin message
+    
+    The server answers with file_upload_ready, then the client sends exactly
+    `size` bytes as binary frames.
+    """
+    try:
+        file_name = data.get("file_name")
+        size = data.get("size")
+        file_type = data.get("file_type")
+        
+        if not file_name or not isinstance(size, int) or size < 0:
+            await manager.send_message(thread_id, {
+                "type": "file_upload_error",
+                "error": "Missing file name or size"
+            })
+            return
+        
+        if size > MAX_UPLOAD_BYTES:
+            await manager.send_message(thread_id, {
+                "type": "file_upload_error",
+                "error": f"File exceeds {MAX_UPLOAD_BYTES} bytes"
+            })
+            return
+        
+        await manager.send_message(thread_id, {
+            "type": "file_upload_ready",
+            "file_name": file_name
+        })
+        
+        content = bytearray()
+        while len(content) < size:
+            content += await websocket.receive_bytes()
+        
+        if len(content) != size:
+            await manager.send_message(thread_id, {
+                "type": "file_upload_error",
+                "error": f"Expected {size} bytes, received {len(content)}"
+            })
+            return
+        
+        daytona_client = websocket.app.state.daytona
+        
+        sandbox_path = f"/workspace/{file_name}"
+        result = await daytona_client.write_file(sandbox_path, content)
+        
+        if result.get("success"):
+            await manager.send_message(thread_id, {
+                "type": "file_upload_success",
+                "file_name": file_name,
+                "sandbox_path": sandbox_path,
+                "size": size,
+                "file_type": file_type
+            })
+        else:
+            await manager.send_message(thread_id, {
+                "type": "file_upload_error",
+                "error": f"Failed to upload file: {result.get('error', 'Unknown error')}"
+            })
+    
+    except WebSocketDisconnect:
+        raise
+    except Exception as e:
+        await manager.send_message(thread_id, {
+            "type": "file_upload_error",
+            "error": f"File upload failed: {str(e)}"
+        })
+
 async def handle_file_download(websocket: WebSocket, data: dict, thread_id: str):
-    """Handle file download from sandbox - background operation"""
+    """Handle file download from sandbox - background operation
+    
+    With "binary": true the content follows a file_download_begin message as
+    binary frames (file_chunk events on msgpack connections); otherwise it is
+    inlined as base64.
+    """
     try:
         file_path = data.get("file_path")
         
@@ -548,22 +816,35 @@ async def handle_file_download(websocket: WebSocket, data: dict, thread_id: str)
             return
         
         # Download from sandbox using Daytona client
-        from services.daytona_client import get_daytona_client
-        daytona_client = get_daytona_client()
+        daytona_client = websocket.app.state.daytona
         
-        result = await daytona_client.read_file(file_path)
+        result = await daytona_client.read_file_bytes(file_path)
         
         if result.get("success"):
-            content = result.get("content", "")
+            content = result.get("content", b"")
+            file_name = os.path.basename(file_path)
+            
+            if data.get("binary"):
+                await manager.send_file(thread_id, {
+                    "type": "file_download_begin",
+                    "file_path": file_path,
+                    "file_name": file_name,
+                    "size": len(content)
+                }, content, {
+                    "type": "file_download_success",
+                    "file_path": file_path,
+                    "file_name": file_name,
+                    "size": len(content)
+                })
+                return
             
             # Encode content as base64 for transfer
-            import base64
-            encoded_content = base64.b64encode(content.encode('utf-8')).decode('utf-8')
+            encoded_content = base64.b64encode(content).decode('ascii')
             
             await manager.send_message(thread_id, {
                 "type": "file_download_success",
                 "file_path": file_path,
-                "file_name": os.path.basename(file_path),
+                "file_name": file_name,
                 "content": encoded_content,
                 "size": len(content)
             })
@@ -585,10 +866,13 @@ async def handle_list_files(websocket: WebSocket, data: dict, thread_id: str):
         folder_path = data.get("folder_path", "/workspace")
         
         # List files using Daytona client
-        from services.daytona_client import get_daytona_client
-        daytona_client = get_daytona_client()
+        daytona_client = websocket.app.state.daytona
         
-        result = await daytona_client.list_files(folder_path)
+        result = await daytona_client.list_files(
+            folder_path,
+            offset=int(data.get("offset", 0)),
+            limit=data.get("limit")
+        )
         
         if result.get("success"):
             files = result.get("files", [])
@@ -596,7 +880,8 @@ async def handle_list_files(websocket: WebSocket, data: dict, thread_id: str):
                 "type": "list_files_success",
                 "folder_path": folder_path,
                 "files": files,
-                "count": len(files)
+                "count": len(files),
+                "total": result.get("total", len(files))
             })
         else:
             await manager.send_message(thread_id, {
@@ -612,4 +897,18 @@ async def handle_list_files(websocket: WebSocket, data: dict, thread_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    if os.getenv("UVICORN_RELOAD") == "1":
+        # Local development: auto-reload, single process
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        # Each worker keeps its own auth/response/stat caches, Gemini prewarm,
+        # Daytona warm pool and current sandbox, so workers are opt-in
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop",
+            http="httptools",
+            ws="websockets",
+            workers=int(os.getenv("WEB_CONCURRENCY", "1"))
+        )
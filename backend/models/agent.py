@@ -2,8 +2,8 @@
 Agent Models - Simplified event types for transparent streaming workflow
 """
 
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any, Literal, Union
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import List, Optional, Dict, Any, Literal, Union, Annotated
 from enum import Enum
 
 
@@ -14,7 +14,12 @@ class EventType(str, Enum):
     ERROR = "error"
 
 
-class ToolCallEvent(BaseModel):
+class BaseEvent(BaseModel):
+    """Streamed events are immutable once emitted"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
+
+class ToolCallEvent(BaseEvent):
     type: Literal[EventType.TOOL_CALL] = EventType.TOOL_CALL
     name: str
     args: Dict[str, Any]
@@ -22,7 +27,7 @@ class ToolCallEvent(BaseModel):
     ts: float
 
 
-class ToolResultEvent(BaseModel):
+class ToolResultEvent(BaseEvent):
     type: Literal[EventType.TOOL_RESULT] = EventType.TOOL_RESULT
     id: str
     name: str
@@ -32,20 +37,26 @@ class ToolResultEvent(BaseModel):
     ts: float
 
 
-class TextEvent(BaseModel):
+class TextEvent(BaseEvent):
     type: Literal[EventType.TEXT] = EventType.TEXT
     content: str
     ts: float
 
 
-class ErrorEvent(BaseModel):
+class ErrorEvent(BaseEvent):
     type: Literal[EventType.ERROR] = EventType.ERROR
     content: str
     ts: float
 
 
-# Union type for all events
-AgentEvent = Union[ToolCallEvent, ToolResultEvent, TextEvent, ErrorEvent]
+# Union type for all events, discriminated by "type"
+AgentEvent = Annotated[
+    Union[ToolCallEvent, ToolResultEvent, TextEvent, ErrorEvent],
+    Field(discriminator="type")
+]
+
+# Built once; validates/dumps any AgentEvent without per-call schema setup
+AGENT_EVENT_ADAPTER: TypeAdapter = TypeAdapter(AgentEvent)
 
 
 class OrchestratorConfig(BaseModel):
@@ -6,19 +6,44 @@ Based on Reference implementation with simplified API for tool usage
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, List
-from daytona_sdk import AsyncDaytona, DaytonaConfig, AsyncSandbox, SessionExecuteRequest, SandboxState
+from typing import Dict, Any, Optional, List, Union, AsyncIterator
+from daytona_sdk import AsyncDaytona, DaytonaConfig, DaytonaError, AsyncSandbox, SessionExecuteRequest, SandboxState
 import os
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The SDK drops the HTTP status and raises a plain DaytonaError; these are
+# the toolbox's messages for a missing path
+_NOT_FOUND_MARKERS = ("not found", "no such file", "404")
+
+def _is_not_found(error: DaytonaError) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in _NOT_FOUND_MARKERS)
+
 class DaytonaClient:
     """Simplified Daytona client for tool operations"""
     
     def __init__(self):
         self.daytona = None
         self.current_sandbox = None
+        # Sessions already created on the current sandbox
+        self._sessions: set[str] = set()
+        self._sessions_sandbox = None
+        
+        # Short-lived file stat results, so check-then-read skips a round-trip;
+        # misses are cached for less time than hits
+        self._stat_cache: TTLCache = TTLCache(maxsize=4096, ttl=2.0)
+        self._missing_cache: TTLCache = TTLCache(maxsize=4096, ttl=0.5)
+        
+        # Pre-provisioned sandboxes so the first tool call skips the cold start
+        self.warm_pool_size = int(os.getenv("WARM_POOL_SIZE", "2"))
+        self._warm: Optional[asyncio.Queue] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        # Serializes taking or creating the current sandbox; per event loop
+        self._sandbox_lock: Optional[asyncio.Lock] = None
+        self._sandbox_lock_loop: Optional[asyncio.AbstractEventLoop] = None
         self._initialize_client()
     
     def _initialize_client(self):
@@ -42,17 +67,147 @@ class DaytonaClient:
             self.daytona = None
     
     async def _ensure_sandbox(self) -> AsyncSandbox:
-        """Ensure we have a working sandbox"""
+        """Ensure we have a working sandbox, taking one from the warm pool if possible"""
         if not self.daytona:
             raise Exception("Daytona client not initialized - check API key")
         
-        if not self.current_sandbox:
-            # For now, we'll use a mock sandbox or create one
-            # In a real implementation, you'd get this from your project/session
-            raise Exception("No sandbox available - sandbox management not implemented")
+        if self.current_sandbox:
+            return self.current_sandbox
+        
+        # Concurrent tool calls must not each take or provision a sandbox;
+        # only the first does, the rest reuse it
+        async with self._get_sandbox_lock():
+            if not self.current_sandbox:
+                sandbox = await self._take_warm_sandbox()
+                if sandbox is None:
+                    # Pool empty or not started; provision on the critical path
+                    sandbox = await self.daytona.create()
+                self.current_sandbox = sandbox
+                self._schedule_refill()
         
         return self.current_sandbox
     
+    def _get_sandbox_lock(self) -> asyncio.Lock:
+        """Get the sandbox provisioning lock for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._sandbox_lock is None or self._sandbox_lock_loop is not loop:
+            self._sandbox_lock = asyncio.Lock()
+            self._sandbox_lock_loop = loop
+        return self._sandbox_lock
+    
+    async def _take_warm_sandbox(self) -> Optional[AsyncSandbox]:
+        """Pop a pooled sandbox that is still running, deleting any that are not"""
+        while self._warm is not None and not self._warm.empty():
+            sandbox = self._warm.get_nowait()
+            try:
+                # Pooled sandboxes can be auto-stopped or fail while idle
+                await sandbox.refresh_data()
+                if sandbox.state == SandboxState.STARTED:
+                    return sandbox
+                logging.warning(f"Discarding warm sandbox {sandbox.id} in state {sandbox.state}")
+            except Exception as e:
+                logging.error(f"Failed to check warm sandbox: {e}")
+            await self._delete_sandbox(sandbox)
+        return None
+    
+    async def _delete_sandbox(self, sandbox: AsyncSandbox) -> None:
+        try:
+            await self.daytona.delete(sandbox)
+        except Exception as e:
+            logging.error(f"Failed to delete sandbox: {e}")
+    
+    async def start_warm_pool(self) -> None:
+        """Start keeping WARM_POOL_SIZE sandboxes provisioned in the background"""
+        if not self.daytona or self.warm_pool_size <= 0:
+            return
+        self._warm = asyncio.Queue()
+        self._schedule_refill()
+    
+    def _schedule_refill(self) -> None:
+        """Top up the warm pool in the background unless a refill is already running"""
+        if self._warm is None:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill_warm_pool())
+    
+    async def _refill_warm_pool(self) -> None:
+        while self._warm.qsize() < self.warm_pool_size:
+            try:
+                sandbox = await self.daytona.create()
+            except Exception as e:
+                logging.error(f"Failed to provision warm sandbox: {e}")
+                return
+            self._warm.put_nowait(sandbox)
+            logging.info(f"Warm sandbox ready ({self._warm.qsize()}/{self.warm_pool_size})")
+    
+    async def discard_sandbox(self) -> None:
+        """Drop the current sandbox; the next call takes a fresh one from the pool"""
+        sandbox, self.current_sandbox = self.current_sandbox, None
+        self._stat_cache.clear()
+        self._missing_cache.clear()
+        if sandbox is not None and self.daytona:
+            await self._delete_sandbox(sandbox)
+        self._schedule_refill()
+    
+    async def aclose(self) -> None:
+        """Stop refilling and delete the unclaimed sandboxes still in the pool
+        
+        The current sandbox holds the user's files and is left running.
+        """
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            self._refill_task = None
+        if self._warm is None:
+            return
+        while not self._warm.empty():
+            await self._delete_sandbox(self._warm.get_nowait())
+        self._warm = None
+    
+    async def _ensure_session(self, sandbox: AsyncSandbox, session_id: str) -> None:
+        """Create a command session once per sandbox instead of on every command"""
+        if sandbox is not self._sessions_sandbox:
+            # Sandbox was swapped; its sessions are unknown
+            self._sessions.clear()
+            self._sessions_sandbox = sandbox
+        
+        if session_id in self._sessions:
+            return
+        
+        try:
+            await sandbox.process.create_session(session_id)
+        except DaytonaError as e:
+            # The SDK has no error code for this; anything else is a real failure
+            if "exist" not in str(e).lower():
+                raise
+        self._sessions.add(session_id)
+    
+    async def _stat(self, sandbox: AsyncSandbox, file_path: str):
+        """get_file_info through the stat cache; raises if the path doesn't exist"""
+        info = self._stat_cache.get(file_path)
+        if info is not None:
+            return info
+        if file_path in self._missing_cache:
+            raise FileNotFoundError(f"No such file: {file_path}")
+        
+        try:
+            info = await sandbox.fs.get_file_info(file_path)
+        except DaytonaError as e:
+            # Only a real miss is remembered; network, auth and rate-limit
+            # failures propagate uncached so the next call retries
+            if _is_not_found(e):
+                self._missing_cache[file_path] = True
+            raise
+        self._stat_cache[file_path] = info
+        return info
+    
+    def _invalidate_stat(self, path: str) -> None:
+        """Forget cached stats for a path and anything beneath it"""
+        prefix = path.rstrip('/') + '/'
+        for cache in (self._stat_cache, self._missing_cache):
+            cache.pop(path, None)
+            for key in [k for k in cache if k.startswith(prefix)]:
+                cache.pop(key, None)
+    
     async def execute_command(self, command: str, timeout_seconds: int = 30) -> Dict[str, Any]:
         """Execute a shell command in the sandbox"""
         try:
@@ -70,11 +225,7 @@ class DaytonaClient:
             # Execute command in sandbox
             session_id = "default-session"
             
-            # Create session if it doesn't exist
-            try:
-                await sandbox.process.create_session(session_id)
-            except:
-                pass  # Session might already exist
+            await self._ensure_session(sandbox, session_id)
             
             # Execute command
             req = SessionExecuteRequest(
@@ -111,36 +262,117 @@ class DaytonaClient:
                 "exit_code": 1
             }
     
+    async def stream_command(self, command: str, timeout_seconds: int = 300) -> AsyncIterator[Dict[str, Any]]:
+        """Run a shell command asynchronously, yielding log chunks as they arrive
+        
+        Yields {"type": "output", "chunk": ...} events followed by a final
+        {"type": "exit", "exit_code": ...} (or {"type": "error", ...}).
+        """
+        if not self.daytona:
+            # Mock response for development
+            yield {"type": "output", "chunk": f"Mock execution of: {command}"}
+            yield {"type": "exit", "exit_code": 0}
+            return
+        
+        try:
+            sandbox = await self._ensure_sandbox()
+            
+            # The callback form of get_session_command_logs_async is what daytona-sdk
+            # 0.21.0 (pinned in requirements.txt) provides; check before starting anything
+            follow_logs = getattr(sandbox.process, "get_session_command_logs_async", None)
+            if follow_logs is None:
+                yield {"type": "error", "error": "Installed daytona-sdk cannot stream command logs"}
+                return
+            
+            session_id = "default-session"
+            await self._ensure_session(sandbox, session_id)
+            
+            response = await sandbox.process.execute_session_command(
+                session_id=session_id,
+                req=SessionExecuteRequest(command=command, var_async=True, cwd="/workspace")
+            )
+        except Exception as e:
+            logging.error(f"Error starting command '{command}': {e}")
+            yield {"type": "error", "error": str(e)}
+            return
+        
+        chunks: asyncio.Queue = asyncio.Queue()
+        follow = asyncio.create_task(follow_logs(
+            session_id, response.cmd_id, chunks.put_nowait
+        ))
+        follow.add_done_callback(lambda _: chunks.put_nowait(None))
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                chunk = await asyncio.wait_for(chunks.get(), remaining)
+                if chunk is None:
+                    break
+                yield {"type": "output", "chunk": chunk}
+            
+            follow.result()
+            cmd = await sandbox.process.get_session_command(session_id, response.cmd_id)
+            yield {"type": "exit", "exit_code": cmd.exit_code}
+        except asyncio.TimeoutError:
+            yield {"type": "error", "error": f"Command timed out after {timeout_seconds}s"}
+        except Exception as e:
+            logging.error(f"Error streaming command '{command}': {e}")
+            yield {"type": "error", "error": str(e)}
+        finally:
+            follow.cancel()
+    
     async def read_file(self, file_path: str) -> Dict[str, Any]:
-        """Read file content from sandbox"""
+        """Read file content from sandbox as text
+        
+        Decodes the bytes from read_file_bytes once; invalid UTF-8 is replaced
+        rather than failing the read.
+        """
+        result = await self.read_file_bytes(file_path)
+        if not result["success"]:
+            return {**result, "content": ""}
+        
+        return {
+            "success": True,
+            "content": result["content"].decode('utf-8', 'replace')
+        }
+    
+    async def read_file_bytes(self, file_path: str) -> Dict[str, Any]:
+        """Read raw file bytes from sandbox, without text decoding"""
         try:
             if not self.daytona:
                 # Mock response for development
                 return {
                     "success": True,
-                    "content": f"Mock content of file: {file_path}"
+                    "content": f"Mock content of file: {file_path}".encode('utf-8')
                 }
             
             sandbox = await self._ensure_sandbox()
-            
-            # Read file using sandbox filesystem
             content = await sandbox.fs.download_file(file_path)
             
             return {
                 "success": True,
-                "content": content.decode('utf-8') if isinstance(content, bytes) else content
+                "content": content.encode('utf-8') if isinstance(content, str) else bytes(content)
             }
             
         except Exception as e:
             logging.error(f"Error reading file '{file_path}': {e}")
             return {
                 "success": False,
-                "content": "",
+                "content": b"",
                 "error": str(e)
             }
     
-    async def write_file(self, file_path: str, content: str) -> Dict[str, Any]:
-        """Write content to file in sandbox"""
+    async def write_file(self, file_path: str, content: Union[str, bytes, bytearray]) -> Dict[str, Any]:
+        """Write content to file in sandbox
+        
+        Text is encoded once; bytes and bytearray go to the SDK as-is, without
+        copying. Plain str must be encoded here, as the SDK would read it as a
+        local file path.
+        """
         try:
             if not self.daytona:
                 # Mock response for development
@@ -152,8 +384,10 @@ class DaytonaClient:
             sandbox = await self._ensure_sandbox()
             
             # Write file using sandbox filesystem
-            content_bytes = content.encode('utf-8') if isinstance(content, str) else content
-            await sandbox.fs.upload_file(content_bytes, file_path)
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            await sandbox.fs.upload_file(content, file_path)
+            self._invalidate_stat(file_path)
             
             return {
                 "success": True,
@@ -181,6 +415,7 @@ class DaytonaClient:
             
             # Delete file using sandbox filesystem
             await sandbox.fs.delete_file(file_path)
+            self._invalidate_stat(file_path)
             
             return {
                 "success": True,
@@ -194,8 +429,14 @@ class DaytonaClient:
                 "error": str(e)
             }
     
-    async def list_files(self, directory: str, recursive: bool = False) -> Dict[str, Any]:
-        """List files in directory"""
+    async def list_files(
+        self,
+        directory: str,
+        recursive: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """List files in directory, optionally one page at a time"""
         try:
             if not self.daytona:
                 # Mock response for development
@@ -204,7 +445,8 @@ class DaytonaClient:
                     "files": [
                         {"name": "file1.txt", "is_directory": False, "size": 1024},
                         {"name": "folder1", "is_directory": True, "size": 0}
-                    ]
+                    ],
+                    "total": 2
                 }
             
             sandbox = await self._ensure_sandbox()
@@ -212,17 +454,17 @@ class DaytonaClient:
             # List files using sandbox filesystem
             files = await sandbox.fs.list_files(directory)
             
-            file_list = []
-            for file_info in files:
-                file_list.append({
-                    "name": file_info.name,
-                    "is_directory": file_info.is_dir,
-                    "size": file_info.size
-                })
+            # The API has no paging, so slice before building entries for the page
+            page = files[offset:] if limit is None else files[offset:offset + limit]
+            file_list = [
+                {"name": f.name, "is_directory": f.is_dir, "size": f.size}
+                for f in page
+            ]
             
             return {
                 "success": True,
-                "files": file_list
+                "files": file_list,
+                "total": len(files)
             }
             
         except Exception as e:
@@ -246,9 +488,9 @@ class DaytonaClient:
             
             # Check file existence using sandbox filesystem
             try:
-                await sandbox.fs.get_file_info(file_path)
+                await self._stat(sandbox, file_path)
                 return {"exists": True}
-            except:
+            except Exception:
                 return {"exists": False}
             
         except Exception as e:
@@ -274,7 +516,7 @@ class DaytonaClient:
             sandbox = await self._ensure_sandbox()
             
             # Get file info using sandbox filesystem
-            file_info = await sandbox.fs.get_file_info(file_path)
+            file_info = await self._stat(sandbox, file_path)
             
             return {
                 "success": True,
@@ -308,6 +550,7 @@ class DaytonaClient:
             
             # Create directory using sandbox filesystem
             await sandbox.fs.create_folder(directory_path, "755")
+            self._invalidate_stat(directory_path)
             
             return {
                 "success": True,
@@ -321,6 +564,62 @@ class DaytonaClient:
                 "error": str(e)
             }
 
+    
+    async def _ensure_sandbox_for_batch(self) -> None:
+        """Resolve the sandbox up front so concurrent calls don't each provision one"""
+        if self.daytona:
+            await self._ensure_sandbox()
+    
+    async def read_files(self, paths: List[str]) -> Dict[str, Any]:
+        """Read several files concurrently; results are in the order of paths"""
+        try:
+            await self._ensure_sandbox_for_batch()
+            results = await asyncio.gather(*[self.read_file(path) for path in paths])
+            return {
+                "success": all(r.get("success") for r in results),
+                "results": [{"path": path, **r} for path, r in zip(paths, results)]
+            }
+            
+        except Exception as e:
+            logging.error(f"Error reading files {paths}: {e}")
+            return {
+                "success": False,
+                "results": [],
+                "error": str(e)
+            }
+    
+    async def write_files(self, items: Dict[str, Union[str, bytes, bytearray]]) -> Dict[str, Any]:
+        """Write several files concurrently, given a mapping of path to content"""
+        try:
+            await self._ensure_sandbox_for_batch()
+            paths = list(items)
+            results = await asyncio.gather(*[self.write_file(path, items[path]) for path in paths])
+            return {
+                "success": all(r.get("success") for r in results),
+                "results": [{"path": path, **r} for path, r in zip(paths, results)]
+            }
+            
+        except Exception as e:
+            logging.error(f"Error writing files {list(items)}: {e}")
+            return {
+                "success": False,
+                "results": [],
+                "error": str(e)
+            }
+    
+    async def file_exists_many(self, paths: List[str]) -> Dict[str, Any]:
+        """Check several paths concurrently"""
+        try:
+            await self._ensure_sandbox_for_batch()
+            results = await asyncio.gather(*[self.file_exists(path) for path in paths])
+            return {
+                "exists": {path: r.get("exists", False) for path, r in zip(paths, results)}
+            }
+            
+        except Exception as e:
+            logging.error(f"Error checking files {paths}: {e}")
+            return {"exists": {path: False for path in paths}}
+
 
 # Global instance
 _daytona_client: Optional[DaytonaClient] = None
@@ -4,20 +4,103 @@ Based on Reference implementation with simplified interface
 """
 
 import asyncio
+import hashlib
 import logging
 import httpx
-from typing import Dict, Any, Optional, List
+import orjson
+from email.utils import parsedate_to_datetime
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from typing import Dict, Any, Optional, List, Sequence
 import os
+import time
 from dotenv import load_dotenv
+from utils.redis_client import get_redis_client
 
 load_dotenv()
 
+# Immutable so the default can't be mutated across calls
+_DEFAULT_FORMATS = ("markdown",)
+
+# Statuses worth retrying: rate limits and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_WAIT = 60.0
+SCRAPE_ATTEMPTS = 5
+REQUEST_TIMEOUT = 30.0
+CONNECT_TIMEOUT = 5.0
+
+# Longest a scrape can take with every attempt timing out and the longest waits
+# between them; the cross-process lock must outlive it
+SCRAPE_BUDGET = SCRAPE_ATTEMPTS * (REQUEST_TIMEOUT + CONNECT_TIMEOUT) + (SCRAPE_ATTEMPTS - 1) * MAX_RETRY_WAIT
+
+_backoff = wait_exponential_jitter(initial=1, max=30)
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in either delta or date form"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _retry_wait(retry_state) -> float:
+    """Honor the server's Retry-After when given, else jittered exponential backoff"""
+    outcome = retry_state.outcome
+    if outcome is not None and not outcome.failed:
+        delay = _retry_after(outcome.result())
+        if delay is not None:
+            return min(delay, MAX_RETRY_WAIT)
+    return _backoff(retry_state)
+
+def _log_retry(retry_state) -> None:
+    outcome = retry_state.outcome
+    reason = outcome.exception() if outcome.failed else f"HTTP {outcome.result().status_code}"
+    logging.warning(
+        f"Firecrawl request failed (attempt {retry_state.attempt_number}): {reason}; "
+        f"retrying in {retry_state.next_action.sleep:.1f}s"
+    )
+
 class FirecrawlClient:
     """Simplified Firecrawl client for web scraping operations"""
     
     def __init__(self):
         self.api_key = os.getenv("FIRECRAWL_API_KEY")
         self.api_url = os.getenv("FIRECRAWL_URL", "https://api.firecrawl.dev")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Concurrent scrape limit, matched by the connection pool size
+        self.concurrency = int(os.getenv("FIRECRAWL_CONCURRENCY", "16"))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Batch scrape settings for scrape_multiple_urls
+        self.batch_size = int(os.getenv("FIRECRAWL_BATCH_SIZE", "50"))
+        self.batch_timeout = float(os.getenv("FIRECRAWL_BATCH_TIMEOUT", "60"))
+        self.batch_poll_interval = 1.0
+        
+        # Scrapes in progress, keyed like the cache, shared by concurrent callers
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Scrape result caching
+        self.cache_ttl = int(os.getenv("FIRECRAWL_CACHE_TTL", "3600"))
+        self.lock_ttl_ms = max(
+            int(os.getenv("FIRECRAWL_LOCK_TTL_MS", "0")),
+            int((SCRAPE_BUDGET + 10) * 1000)
+        )
+        # How long other processes wait on the lock holder before scraping themselves
+        self.lock_wait = float(os.getenv("FIRECRAWL_LOCK_WAIT_S", "30"))
         self._initialize_client()
     
     def _initialize_client(self):
@@ -27,97 +110,163 @@ class FirecrawlClient:
                 logging.info("Firecrawl client initialized successfully")
             else:
                 logging.warning("No Firecrawl API key found - using mock mode")
+                # Decide once, so the real scrape path never checks for mock mode
+                self.scrape_url = self._mock_scrape_url
                 
         except Exception as e:
             logging.error(f"Failed to initialize Firecrawl client: {e}")
     
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, rebuilding it if the event loop changed
+        
+        Workers run each task under its own asyncio.run, and pooled
+        connections cannot outlive the loop that opened them.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            # Failed connects are retried by the transport; tenacity handles 429/5xx
+            transport = httpx.AsyncHTTPTransport(
+                retries=3,
+                http2=True,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                transport=transport,
+                timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+            self._client_loop = loop
+        return self._client
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the batch concurrency semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
+    @staticmethod
+    def _cache_key(url: str, formats: Sequence[str], onlyMainContent: bool, maxLength: int) -> str:
+        raw = f"{url}|{sorted(formats)}|{onlyMainContent}|{maxLength}"
+        return "fc:" + hashlib.sha1(raw.encode()).hexdigest()
+    
     async def scrape_url(
         self,
         url: str,
-        formats: List[str] = ["markdown"],
+        formats: Optional[Sequence[str]] = None,
         onlyMainContent: bool = True,
         maxLength: int = 4000
+    ) -> Dict[str, Any]:
+        """Scrape a single URL, serving repeats from the Redis cache"""
+        formats = _DEFAULT_FORMATS if formats is None else formats
+        key = self._cache_key(url, formats, onlyMainContent, maxLength)
+        
+        # Single-flight: identical concurrent calls share one scrape
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._scrape_url_cached(key, url, formats, onlyMainContent, maxLength))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the others' scrape
+        return await asyncio.shield(task)
+    
+    async def _mock_scrape_url(
+        self,
+        url: str,
+        formats: Optional[Sequence[str]] = None,
+        onlyMainContent: bool = True,
+        maxLength: int = 4000
+    ) -> Dict[str, Any]:
+        """Mock response for development, bound over scrape_url when there is no API key"""
+        return {
+            "success": True,
+            "url": url,
+            "title": f"Mock title for {url}",
+            "content": f"Mock content extracted from {url}",
+            "markdown": f"# Mock Markdown Content\n\nThis is mock content from {url}",
+            "html": f"<html><body><h1>Mock HTML Content</h1><p>This is mock content from {url}</p></body></html>",
+            "metadata": {
+                "title": f"Mock title for {url}",
+                "description": f"Mock description for {url}",
+                "language": "en"
+            }
+        }
+    
+    async def _scrape_url_cached(
+        self,
+        key: str,
+        url: str,
+        formats: Sequence[str],
+        onlyMainContent: bool,
+        maxLength: int
+    ) -> Dict[str, Any]:
+        """Scrape through the Redis cache and cross-process lock"""
+        redis_client = get_redis_client()
+        
+        cached = await redis_client.cache_get(key)
+        if cached is not None:
+            return cached
+        
+        # Only the lock holder scrapes; other processes wait for its result,
+        # taking over if it finishes without caching or its lock expires, and
+        # scraping unlocked if it takes longer than lock_wait
+        lock_key = f"{key}:lock"
+        token = await redis_client.acquire_lock(lock_key, self.lock_ttl_ms)
+        deadline = time.monotonic() + self.lock_wait
+        while token is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            cached = await redis_client.cache_get(key)
+            if cached is not None:
+                return cached
+            token = await redis_client.acquire_lock(lock_key, self.lock_ttl_ms)
+        
+        try:
+            result = await self._scrape_url(url, formats, onlyMainContent, maxLength)
+            if result.get("success"):
+                await redis_client.cache_set(key, result, ttl=self.cache_ttl)
+            return result
+        finally:
+            if token is not None:
+                await redis_client.release_lock(lock_key, token)
+    
+    async def _scrape_url(
+        self,
+        url: str,
+        formats: Sequence[str],
+        onlyMainContent: bool,
+        maxLength: int
     ) -> Dict[str, Any]:
         """Scrape a single URL using Firecrawl API"""
         try:
-            if not self.api_key:
-                # Mock response for development
-                return {
-                    "success": True,
-                    "url": url,
-                    "title": f"Mock title for {url}",
-                    "content": f"Mock content extracted from {url}",
-                    "markdown": f"# Mock Markdown Content\n\nThis is mock content from {url}",
-                    "html": f"<html><body><h1>Mock HTML Content</h1><p>This is mock content from {url}</p></body></html>",
-                    "metadata": {
-                        "title": f"Mock title for {url}",
-                        "description": f"Mock description for {url}",
-                        "language": "en"
-                    }
-                }
-            
-            # Make request to Firecrawl API
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                }
-                
-                payload = {
-                    "url": url,
-                    "formats": formats,
-                    "onlyMainContent": onlyMainContent,
-                    "maxLength": maxLength
-                }
-                
-                # Use retry logic for reliability
-                max_retries = 3
-                timeout_seconds = 30
-                retry_count = 0
-                
-                while retry_count < max_retries:
-                    try:
-                        logging.info(f"Sending request to Firecrawl (attempt {retry_count + 1}/{max_retries})")
-                        response = await client.post(
-                            f"{self.api_url}/v1/scrape",
-                            json=payload,
-                            headers=headers,
-                            timeout=timeout_seconds,
-                        )
-                        response.raise_for_status()
-                        data = response.json()
-                        logging.info(f"Successfully received response from Firecrawl for {url}")
-                        break
-                    except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ReadError) as timeout_err:
-                        retry_count += 1
-                        logging.warning(f"Request timed out (attempt {retry_count}/{max_retries}): {str(timeout_err)}")
-                        if retry_count >= max_retries:
-                            raise Exception(f"Request timed out after {max_retries} attempts with {timeout_seconds}s timeout")
-                        # Exponential backoff
-                        logging.info(f"Waiting {2 ** retry_count}s before retry")
-                        await asyncio.sleep(2 ** retry_count)
-                    except Exception as e:
-                        # Don't retry on non-timeout errors
-                        logging.error(f"Error during scraping: {str(e)}")
-                        raise e
-            
-            # Format the response
-            title = data.get("data", {}).get("metadata", {}).get("title", "")
-            markdown_content = data.get("data", {}).get("markdown", "")
-            html_content = data.get("data", {}).get("html", "")
+            # Make request to Firecrawl API over the pooled client
+            client = self._get_http_client()
             
-            logging.info(f"Extracted content from {url}: title='{title}', content length={len(markdown_content)}")
-            
-            return {
-                "success": True,
+            payload = {
                 "url": url,
-                "title": title,
-                "content": markdown_content,
-                "markdown": markdown_content,
-                "html": html_content,
-                "metadata": data.get("data", {}).get("metadata", {}),
-                "provider": "firecrawl"
+                "formats": formats,
+                "onlyMainContent": onlyMainContent,
+                "maxLength": maxLength
             }
+            
+            logging.info(f"Sending request to Firecrawl for {url}")
+            response = await self._do_scrape(client, payload)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            logging.info(f"Successfully received response from Firecrawl for {url}")
+            
+            return self._format_page(url, data.get("data", {}), maxLength)
         
         except Exception as e:
             error_message = str(e)
@@ -129,14 +278,145 @@ class FirecrawlClient:
                 "provider": "firecrawl"
             }
     
+    @retry(
+        retry=retry_if_exception_type(httpx.TransportError)
+        | retry_if_result(lambda response: response.status_code in RETRY_STATUSES),
+        wait=_retry_wait,
+        stop=stop_after_attempt(SCRAPE_ATTEMPTS),
+        before_sleep=_log_retry,
+        # Hand back the last response (or raise its error) once attempts run out
+        retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+    )
+    async def _do_scrape(self, client: httpx.AsyncClient, payload: Dict[str, Any]) -> httpx.Response:
+        """POST one scrape, retried on transport errors and retryable statuses"""
+        return await client.post("/v1/scrape", content=orjson.dumps(payload))
+    
+    def _format_page(self, url: str, page: Dict[str, Any], maxLength: int) -> Dict[str, Any]:
+        """Shape one scraped page from the Firecrawl API into our result format
+        
+        Content is cut to maxLength here as well, in case the server did not
+        truncate, so oversized pages never reach the cache or the model.
+        """
+        title = page.get("metadata", {}).get("title", "")
+        markdown_content = (page.get("markdown") or "")[:maxLength]
+        html_content = (page.get("html") or "")[:maxLength]
+        
+        logging.info(f"Extracted content from {url}: title='{title}', content length={len(markdown_content)}")
+        
+        return {
+            "success": True,
+            "url": url,
+            "title": title,
+            "content": markdown_content,
+            "markdown": markdown_content,
+            "html": html_content,
+            "metadata": page.get("metadata", {}),
+            "provider": "firecrawl"
+        }
+    
+    async def _scrape_urls_batched(
+        self,
+        urls: List[str],
+        formats: Sequence[str],
+        onlyMainContent: bool,
+        maxLength: int
+    ) -> Dict[str, Dict[str, Any]]:
+        """Resolve URLs from the cache, then via /v1/batch/scrape in groups
+        
+        Returns whatever could be resolved; callers scrape the rest one by one,
+        which also covers servers without the batch endpoint.
+        """
+        redis_client = get_redis_client()
+        resolved: Dict[str, Dict[str, Any]] = {}
+        
+        for url in urls:
+            cached = await redis_client.cache_get(self._cache_key(url, formats, onlyMainContent, maxLength))
+            if cached is not None:
+                resolved[url] = cached
+        
+        missing = [url for url in urls if url not in resolved]
+        for i in range(0, len(missing), self.batch_size):
+            group = missing[i:i + self.batch_size]
+            try:
+                pages = await self._batch_scrape(group, formats, onlyMainContent)
+            except Exception as e:
+                logging.warning(f"Batch scrape failed, falling back to single scrapes: {e}")
+                break
+            if pages is None:
+                break
+            
+            for url in group:
+                page = pages.get(url)
+                if page is None:
+                    continue
+                result = self._format_page(url, page, maxLength)
+                resolved[url] = result
+                await redis_client.cache_set(
+                    self._cache_key(url, formats, onlyMainContent, maxLength),
+                    result,
+                    ttl=self.cache_ttl
+                )
+        
+        return resolved
+    
+    async def _batch_scrape(
+        self,
+        urls: List[str],
+        formats: Sequence[str],
+        onlyMainContent: bool
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Run one Firecrawl batch scrape job; pages keyed by source URL, None if unsupported"""
+        client = self._get_http_client()
+        
+        response = await client.post("/v1/batch/scrape", content=orjson.dumps({
+            "urls": urls,
+            "formats": formats,
+            "onlyMainContent": onlyMainContent
+        }))
+        if response.status_code in (400, 404):
+            return None
+        response.raise_for_status()
+        job_id = orjson.loads(response.content).get("id")
+        if not job_id:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_timeout
+        while True:
+            await asyncio.sleep(self.batch_poll_interval)
+            response = await client.get(f"/v1/batch/scrape/{job_id}")
+            response.raise_for_status()
+            status = orjson.loads(response.content)
+            if status.get("status") == "completed":
+                break
+            if status.get("status") == "failed":
+                raise Exception(f"Batch scrape {job_id} failed")
+            if loop.time() > deadline:
+                raise Exception(f"Batch scrape {job_id} timed out after {self.batch_timeout}s")
+        
+        # Results may be paginated through "next" links
+        pages: Dict[str, Dict[str, Any]] = {}
+        while True:
+            for page in status.get("data") or []:
+                source_url = page.get("metadata", {}).get("sourceURL")
+                if source_url:
+                    pages[source_url] = page
+            next_url = status.get("next")
+            if not next_url:
+                return pages
+            response = await client.get(next_url)
+            response.raise_for_status()
+            status = orjson.loads(response.content)
+    
     async def scrape_multiple_urls(
         self,
         urls: List[str],
-        formats: List[str] = ["markdown"],
+        formats: Optional[Sequence[str]] = None,
         onlyMainContent: bool = True,
         maxLength: int = 4000
     ) -> Dict[str, Any]:
         """Scrape multiple URLs concurrently"""
+        formats = _DEFAULT_FORMATS if formats is None else formats
         try:
             if not urls:
                 return {
@@ -147,9 +427,22 @@ class FirecrawlClient:
             
             logging.info(f"Scraping {len(urls)} URLs: {urls}")
             
-            # Process URLs concurrently
-            tasks = [self.scrape_url(url, formats, onlyMainContent, maxLength) for url in urls]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Batch what we can in one request per group of URLs
+            resolved: Dict[str, Dict[str, Any]] = {}
+            unique_urls = list(dict.fromkeys(urls))
+            if self.api_key and len(unique_urls) > 1:
+                resolved = await self._scrape_urls_batched(unique_urls, formats, onlyMainContent, maxLength)
+            
+            # Scrape the rest concurrently, at most FIRECRAWL_CONCURRENCY at a time
+            semaphore = self._get_semaphore()
+            
+            async def scrape_one(url: str) -> Dict[str, Any]:
+                if url in resolved:
+                    return resolved[url]
+                async with semaphore:
+                    return await self.scrape_url(url, formats, onlyMainContent, maxLength)
+            
+            results = await asyncio.gather(*[scrape_one(url) for url in urls], return_exceptions=True)
             
             # Process results
             processed_results = []
@@ -5,80 +5,151 @@ Optimized for instant responses and real-time tool execution
 
 import os
 import time
+import functools
+import logging
+from types import MappingProxyType
 import asyncio
-import json
-from typing import AsyncGenerator, Dict, Any, List, Optional
+import hashlib
+import orjson
+from typing import AsyncGenerator, Dict, Any, List, Optional, Tuple
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core import exceptions as google_exceptions
+from google.protobuf.json_format import MessageToDict
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 # Load environment variables
 # Load environment variables from root directory
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
 
+# Transient failures worth retrying with backoff; anything else is surfaced at once
+_TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
 
-class GeminiClient:
-    """Ultra-fast Gemini 2.5 Flash client with streaming and function calling"""
+# Canonical JSON for hashing prompts and tool schemas
+_HASH_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+_VALID_BUDGETS = frozenset(("low", "medium", "high"))
+
+# Thread history roles as Gemini content roles
+_ROLE_MAP = {"user": "user", "assistant": "model"}
+
+# Model-level generation config for maximum speed, shared by every chat model
+_GENERATION_CONFIG: Dict[str, Any] = {
+    "temperature": 0.7,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+    "candidate_count": 1,
+    "stop_sequences": [],
+    # MAXIMUM SPEED optimizations
+    "response_mime_type": "text/plain",  # Faster than JSON
+    "response_schema": None,  # No schema validation for speed
+}
+
+# Model-level safety settings, shared read-only (the SDK copies them)
+_SAFETY_SETTINGS = MappingProxyType({
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+})
+
+
+@functools.cache
+def _warn_sdk_internal(message: str) -> None:
+    """Log a missing SDK internal once per process instead of on every call"""
+    logging.warning(message)
+
+
+async def _close_stream(stream) -> None:
+    """Stop reading an unfinished Gemini stream so the RPC is torn down
     
-    def __init__(self):
-        # Configure Gemini API
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key or api_key == "your-google-api-key-here":
-            self.api_key_configured = False
-            print("⚠️  GOOGLE_API_KEY not configured - Gemini client will return error messages")
-            return
-        
-        try:
-            genai.configure(api_key=api_key)
-            self.api_key_configured = True
-        except Exception as e:
-            print(f"❌ Failed to configure Gemini API: {e}")
-            self.api_key_configured = False
-            return
-        
-        # Model configuration for maximum speed
-        self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-        self.thinking_budget = os.getenv("GEMINI_THINKING_BUDGET", "medium")
-        
-        # BLAZING FAST streaming settings - MAXIMUM SPEED
-        self.ultra_fast_streaming = os.getenv("ULTRA_FAST_STREAMING", "true").lower() == "true"
-        self.streaming_mode = os.getenv("STREAMING_MODE", "character")  # character, word, chunk
-        self.streaming_chunk_size = int(os.getenv("STREAMING_CHUNK_SIZE", "10"))  # LARGE batches for speed
-        self.streaming_delay = float(os.getenv("STREAMING_DELAY", "0"))  # ZERO delay - MAXIMUM SPEED
-        
-        # Initialize model with optimized settings for faster streaming
-        self.model = genai.GenerativeModel(
-            model_name=self.model_name,
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-                "candidate_count": 1,
-                "stop_sequences": [],
-                # MAXIMUM SPEED optimizations
-                "response_mime_type": "text/plain",  # Faster than JSON
-                "response_schema": None,  # No schema validation for speed
-            },
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            }
+    The SDK exposes no cancel; closing its underlying iterator drops the last
+    reference to the gRPC call, which cancels it. _iterator is SDK-private,
+    checked against google-generativeai 0.8.5 (pinned in requirements.txt).
+    """
+    aclose = getattr(getattr(stream, "_iterator", None), "aclose", None)
+    if aclose is None:
+        _warn_sdk_internal(
+            "Gemini stream has no _iterator.aclose; unfinished streams are not "
+            "cancelled (google-generativeai changed?)"
         )
-        
-        # Performance tracking
-        self.request_count = 0
-        self.total_tokens = 0
-        self.avg_response_time = 0.0
-        
-        # System instructions for agentic AI behavior
-        self.system_instructions = self._get_system_instructions()
+        return
+    try:
+        await aclose()
+    except Exception:
+        pass
+
+
+def _extract_text(response) -> str:
+    """Text of a response or streamed chunk
+    
+    response.text raises ValueError when a part isn't text, in which case
+    the text parts are joined directly.
+    """
+    try:
+        return response.text or ""
+    except (AttributeError, ValueError):
+        parts = getattr(response, 'parts', None) or ()
+        return "".join(getattr(part, 'text', None) or "" for part in parts)
+
+
+def _call_args(call) -> Dict[str, Any]:
+    """Function call arguments as plain nested dicts and lists
+    
+    The SDK hands back a MapComposite whose nested values convert lazily on
+    every access; converting the underlying Struct once materializes the
+    whole tree. _pb is proto-plus private, checked against
+    google-generativeai 0.8.5 (pinned in requirements.txt); without it the
+    public args mapping is converted, top level only.
+    """
+    pb = getattr(call, '_pb', None)
+    if pb is not None:
+        return MessageToDict(pb.args)
+    _warn_sdk_internal(
+        "Gemini function call has no _pb; falling back to dict(call.args) "
+        "(google-generativeai changed?)"
+    )
+    args = getattr(call, 'args', None)
+    return dict(args) if args else {}
+
+
+def _extract_chunk(chunk) -> Tuple[str, List[Any], Any]:
+    """Pull (text, function_calls, thinking) out of a streamed response chunk
+    
+    chunk.text and chunk.function_calls each walk the parts again, so the
+    first candidate's parts (the model is configured for one) are walked
+    once, collecting both. A part holds either text or a function call.
+    """
+    texts: List[str] = []
+    function_calls: List[Any] = []
+    candidates = getattr(chunk, 'candidates', None)
+    if candidates:
+        content = getattr(candidates[0], 'content', None)
+        for part in getattr(content, 'parts', None) or ():
+            text = getattr(part, 'text', None)
+            if text:
+                texts.append(text)
+            else:
+                call = getattr(part, 'function_call', None)
+                if call:
+                    function_calls.append(call)
     
-    def _get_system_instructions(self) -> str:
-        """Comprehensive system instructions for agentic AI behavior"""
-        return """You are Iris, an advanced autonomous AI agent with access to powerful tools and capabilities. Your mission is to be helpful, accurate, and proactive in solving complex problems.
+    return "".join(texts), function_calls, getattr(chunk, 'thinking', None)
+
+
+@functools.cache
+def _system_instructions() -> str:
+    """Comprehensive system instructions for agentic AI behavior, one shared str"""
+    return """You are Iris, an advanced autonomous AI agent with access to powerful tools and capabilities. Your mission is to be helpful, accurate, and proactive in solving complex problems.
 
 ## Core Identity
 - You are a sophisticated AI assistant capable of autonomous reasoning, planning, and execution
@@ -122,6 +193,170 @@ class GeminiClient:
 - Be transparent about what you can and cannot do
 
 Remember: You are an autonomous agent. Use your tools proactively to provide the best possible assistance. Don't just answer questions - solve problems comprehensively."""
+
+
+class GeminiClient:
+    """Ultra-fast Gemini 2.5 Flash client with streaming and function calling"""
+    
+    __slots__ = (
+        "api_key_configured", "model_name", "thinking_budget", "request_timeout",
+        "coalesce_chars", "coalesce_window", "_model",
+        "request_count", "total_tokens", "avg_response_time",
+        "cache_size", "_response_cache", "cache_hits", "cache_misses", "_inflight",
+        "_tools_config_cache", "_registered_tools", "_registered_tools_key", "_registered_tools_config",
+    )
+    
+    def __init__(self):
+        # Configure Gemini API
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key or api_key == "your-google-api-key-here":
+            self.api_key_configured = False
+            print("⚠️  GOOGLE_API_KEY not configured - Gemini client will return error messages")
+            return
+        
+        try:
+            # gRPC runs over HTTP/2, so concurrent requests multiplex over the
+            # client's cached, kept-alive channel instead of new connections
+            genai.configure(api_key=api_key, transport=os.getenv("GEMINI_TRANSPORT", "grpc"))
+            self.api_key_configured = True
+        except Exception as e:
+            print(f"❌ Failed to configure Gemini API: {e}")
+            self.api_key_configured = False
+            return
+        
+        # Model configuration for maximum speed
+        self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+        self.thinking_budget = os.getenv("GEMINI_THINKING_BUDGET", "medium")
+        self.request_timeout = float(os.getenv("GEMINI_TIMEOUT_S", "30"))
+        
+        # Text events are merged until this many chars or this long after the first
+        self.coalesce_chars = int(os.getenv("STREAM_COALESCE_CHARS", "64"))
+        self.coalesce_window = float(os.getenv("STREAM_COALESCE_MS", "25")) / 1000
+        
+        # Built on first use; title generation and stats never need it
+        self._model: Optional[genai.GenerativeModel] = None
+        
+        # Performance tracking
+        self.request_count = 0
+        self.total_tokens = 0
+        self.avg_response_time = 0.0
+        
+        # Exact-match response cache for repeated prompts in agent loops
+        self.cache_size = int(os.getenv("GEMINI_CACHE_SIZE", "256"))
+        self._response_cache: TTLCache = TTLCache(
+            maxsize=max(self.cache_size, 1),
+            ttl=float(os.getenv("GEMINI_CACHE_TTL", "300"))
+        )
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Identical requests already on the wire, awaited by later callers instead of resent
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Gemini tools config per distinct tool schema list
+        self._tools_config_cache: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+        self._registered_tools: Optional[List[Dict[str, Any]]] = None
+        self._registered_tools_key = ""
+        self._registered_tools_config: Optional[List[Dict[str, Any]]] = None
+
+    
+    @property
+    def model(self) -> genai.GenerativeModel:
+        """The chat model, created on first access"""
+        if self._model is None:
+            self._model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=_GENERATION_CONFIG,
+                safety_settings=_SAFETY_SETTINGS,
+                system_instruction=_system_instructions()
+            )
+        return self._model
+    
+    @property
+    def system_instructions(self) -> str:
+        """System instructions shared by every client instance"""
+        return _system_instructions()
+    
+    @staticmethod
+    def history_to_messages(history: Optional[List[Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """Convert thread history into Gemini contents, dropping empty and unknown turns"""
+        if not history:
+            return []
+        return [
+            {"role": _ROLE_MAP[msg["role"]], "parts": [{"text": content}]}
+            for msg in history
+            if msg["role"] in _ROLE_MAP and (content := msg.get("content", "").strip())
+        ]
+    
+    def _build_messages(
+        self,
+        message: str,
+        thread_history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """History, then the current message
+        
+        The system instructions travel as the model's system_instruction,
+        not as leading turns.
+        """
+        messages = self.history_to_messages(thread_history)
+        
+        # Add current user message (ensure it's not empty)
+        if message and message.strip():
+            messages.append({"role": "user", "parts": [{"text": message.strip()}]})
+        return messages
+    
+    @retry(
+        retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+        wait=wait_exponential_jitter(initial=0.5, max=8),
+        stop=stop_after_attempt(3),
+        reraise=True,
+    )
+    async def _generate(self, *args, **kwargs):
+        """generate_content_async with a per-attempt timeout and retries on transient errors
+        
+        For streams the timeout covers opening the stream, not reading it.
+        """
+        async with asyncio.timeout(self.request_timeout):
+            return await self.model.generate_content_async(*args, **kwargs)
+    
+    async def prewarm(self) -> None:
+        """Open the connection to Gemini with a tiny request before real traffic arrives"""
+        if not self.api_key_configured:
+            return
+        try:
+            async with asyncio.timeout(self.request_timeout):
+                await self.model.generate_content_async("ping", generation_config={"max_output_tokens": 1})
+        except Exception as e:
+            print(f"⚠️  Gemini prewarm failed: {e}")
+    
+    def _cache_key(
+        self,
+        kind: str,
+        message: str,
+        thread_history: Optional[List[Dict[str, str]]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """Hash everything that determines the model's response"""
+        raw = orjson.dumps(
+            [kind, self.model_name, self.thinking_budget, self._tools_key(tools), thread_history, message],
+            default=str,
+            option=_HASH_OPTIONS
+        )
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Any:
+        if self.cache_size <= 0:
+            return None
+        cached = self._response_cache.get(key)
+        if cached is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return cached
+    
+    def _cache_put(self, key: str, value: Any) -> None:
+        if self.cache_size > 0:
+            self._response_cache[key] = value
     
     def _build_function_declarations(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Convert tool schemas to Gemini function declarations"""
@@ -138,6 +373,43 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
         
         return function_declarations
     
+    def register_tools(self, tools: List[Dict[str, Any]]) -> None:
+        """Precompute the key and config for the app's fixed tool list
+        
+        Calls passing this same list object skip hashing and lookup entirely.
+        """
+        self._registered_tools = None
+        self._registered_tools_config = self._get_tools_config(tools)
+        self._registered_tools_key = self._tools_key(tools)
+        self._registered_tools = tools
+    
+    def _tools_key(self, tools: Optional[List[Dict[str, Any]]]) -> str:
+        """Stable digest of a tool schema list"""
+        if not tools:
+            return ""
+        if tools is self._registered_tools:
+            return self._registered_tools_key
+        return hashlib.blake2b(
+            orjson.dumps(tools, default=str, option=_HASH_OPTIONS), digest_size=16
+        ).hexdigest()
+    
+    def _get_tools_config(self, tools: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Tools config for generate_content, built once per distinct tool schema list
+        
+        The result is only read by generate_content, so sharing it is safe.
+        """
+        if not tools:
+            return None
+        if tools is self._registered_tools:
+            return self._registered_tools_config
+        key = self._tools_key(tools)
+        if key not in self._tools_config_cache:
+            function_declarations = self._build_function_declarations(tools)
+            self._tools_config_cache[key] = (
+                [{"function_declarations": function_declarations}] if function_declarations else None
+            )
+        return self._tools_config_cache[key]
+    
     async def chat_with_tools_streaming(
         self, 
         message: str, 
@@ -154,202 +426,184 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
         - {"type": "tool_call", "name": str, "args": dict, "timestamp": float}
         - {"type": "thinking", "content": str, "timestamp": float}
         - {"type": "error", "content": str, "timestamp": float}
+        
+        Text is forwarded as Gemini produces it; ultra_fast_streaming is accepted
+        for compatibility and no longer changes the output.
+        Repeated prompts are replayed from the response cache as the same events,
+        but only for responses without tool calls, so tools always run on a
+        fresh model decision.
+        """
+        cache_key = self._cache_key("stream", message, thread_history, tools)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            now = time.time()
+            for i, event in enumerate(cached):
+                yield {**event, "timestamp": now}
+                # Let other tasks run now and then during long replays
+                if (i & 15) == 15:
+                    await asyncio.sleep(0)
+            return
+        
+        events: List[Dict[str, Any]] = []
+        cacheable = True
+        async for event in self._coalesce_text(self._stream_with_tools(
+            message, tools, thread_history, thinking_budget, ultra_fast_streaming
+        )):
+            if event["type"] in ("error", "tool_call"):
+                cacheable = False
+            elif cacheable:
+                events.append(event)
+            yield event
+        
+        if cacheable:
+            self._cache_put(cache_key, events)
+    
+    async def _coalesce_text(
+        self,
+        events: AsyncGenerator[Dict[str, Any], None]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Merge runs of text events so downstream sends fewer, larger frames
+        
+        Buffered text is flushed at coalesce_chars, coalesce_window after it
+        started, before any other event, and at the end of the stream.
         """
+        loop = asyncio.get_running_loop()
+        buffer: List[str] = []
+        size = 0
+        first_ts = 0.0
+        deadline = 0.0
+        pending: Optional[asyncio.Future] = None
+        
+        def flush() -> Dict[str, Any]:
+            nonlocal size
+            event = {"type": "text", "content": "".join(buffer), "timestamp": first_ts}
+            buffer.clear()
+            size = 0
+            return event
+        
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(events.__anext__())
+                if buffer:
+                    # Don't hold buffered text past its window waiting on the model
+                    done, _ = await asyncio.wait({pending}, timeout=max(0.0, deadline - loop.time()))
+                    if not done:
+                        yield flush()
+                        continue
+                
+                try:
+                    event = await pending
+                except StopAsyncIteration:
+                    break
+                finally:
+                    pending = None
+                
+                if event["type"] == "text":
+                    if not buffer:
+                        first_ts = event["timestamp"]
+                        deadline = loop.time() + self.coalesce_window
+                    buffer.append(event["content"])
+                    size += len(event["content"])
+                    if size >= self.coalesce_chars:
+                        yield flush()
+                else:
+                    if buffer:
+                        yield flush()
+                    yield event
+            
+            if buffer:
+                yield flush()
+        finally:
+            if pending is not None:
+                pending.cancel()
+                try:
+                    await pending
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+            await events.aclose()
+    
+    async def _stream_with_tools(
+        self, 
+        message: str, 
+        tools: List[Dict[str, Any]], 
+        thread_history: Optional[List[Dict[str, str]]] = None,
+        thinking_budget: Optional[str] = None,
+        ultra_fast_streaming: Optional[bool] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream a fresh response from Gemini, bypassing the cache"""
         start_time = time.time()
         self.request_count += 1
         
-        # Use instance setting if not overridden
-        if ultra_fast_streaming is None:
-            ultra_fast_streaming = self.ultra_fast_streaming
-        
+        response_stream = None
+        finished = False
         try:
             # Build conversation context for Gemini with system instructions
-            messages = []
-            
-            # Add system instructions as the first message
-            messages.append({"role": "user", "parts": [{"text": self.system_instructions}]})
-            messages.append({"role": "model", "parts": [{"text": "I understand. I am Iris, an autonomous AI agent with access to powerful tools. I will use them proactively to provide comprehensive assistance and solve problems systematically."}]})
-            
-            # Add thread history
-            if thread_history:
-                for msg in thread_history:
-                    content = msg.get("content", "").strip()
-                    if content:  # Only add non-empty messages
-                        if msg["role"] == "user":
-                            messages.append({"role": "user", "parts": [{"text": content}]})
-                        elif msg["role"] == "assistant":
-                            messages.append({"role": "model", "parts": [{"text": content}]})
-            
-            # Add current user message (ensure it's not empty)
-            if message and message.strip():
-                messages.append({"role": "user", "parts": [{"text": message.strip()}]})
+            messages = self._build_messages(message, thread_history)
             
             # Configure tools if provided
-            tools_config = None
-            if tools:
-                function_declarations = self._build_function_declarations(tools)
-                if function_declarations:
-                    tools_config = [{"function_declarations": function_declarations}]
+            tools_config = self._get_tools_config(tools)
             
-            # Generate content with streaming (thinking disabled)
-            generation_config = {
-                "temperature": 0.7,
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-                "candidate_count": 1,
-            }
-            
-            # Use synchronous streaming in a thread to avoid blocking
-            def sync_stream():
-                # For Gemini 2.0 Flash, we need to use generate_content with tools parameter
-                if tools_config:
-                    return self.model.generate_content(
-                        messages,
-                        tools=tools_config,
-                        generation_config=generation_config,
-                        stream=True
-                    )
-                else:
-                    return self.model.generate_content(
-                        messages,
-                        generation_config=generation_config,
-                        stream=True
-                    )
-            
-            # Run synchronous streaming in executor
-            loop = asyncio.get_event_loop()
-            response_stream = await loop.run_in_executor(None, sync_stream)
+            # Native async streaming (thinking disabled); chunks arrive without
+            # blocking the event loop. The model's own generation config applies
+            response_stream = await self._generate(
+                messages,
+                tools=tools_config,
+                stream=True
+            )
             
             # Stream the response with immediate token yielding
-            for chunk in response_stream:
-                chunk_time = time.time()
+            now = time.time
+            async for chunk in response_stream:
+                chunk_time = now()
+                text_content, function_calls, thinking = _extract_chunk(chunk)
                 
-                # Handle text content - check for valid parts first
-                try:
-                    if hasattr(chunk, 'text') and chunk.text:
-                        # Split text into individual tokens/words for faster streaming
-                        text_content = chunk.text
-                        if ultra_fast_streaming and len(text_content) > 3:
-                            # BLAZING FAST mode: stream in LARGE batches for MAXIMUM SPEED
-                            chunk_size = self.streaming_chunk_size  # LARGE chunks for speed
-                            for i in range(0, len(text_content), chunk_size):
-                                char_batch = text_content[i:i + chunk_size]
-                                yield {
-                                    "type": "text",
-                                    "content": char_batch,
-                                    "timestamp": chunk_time  # SAME timestamp - NO delays!
-                                }
-                                # ABSOLUTELY NO delays - MAXIMUM SPEED!
-                        elif len(text_content) > 10:  # Only split longer chunks
-                            # Word-level streaming for balance of speed and readability
-                            words = text_content.split(' ')
-                            for i, word in enumerate(words):
-                                if word.strip():  # Skip empty words
-                                    yield {
-                                        "type": "text",
-                                        "content": word + (' ' if i < len(words) - 1 else ''),
-                                        "timestamp": chunk_time + (i * 0.001)  # Slight delay for ordering
-                                    }
-                                    # NO delays - MAXIMUM SPEED!
-                        else:
-                            # For short chunks, yield immediately - NO processing delays
-                            yield {
-                                "type": "text",
-                                "content": text_content,
-                                "timestamp": chunk_time
-                            }
-                except Exception as text_error:
-                    # If text access fails, try to get text from parts
-                    try:
-                        if hasattr(chunk, 'parts') and chunk.parts:
-                            text_content = ""
-                            for part in chunk.parts:
-                                if hasattr(part, 'text') and part.text:
-                                    text_content += part.text
-                            if text_content:
-                                # Apply same BLAZING FAST streaming to parts
-                                if ultra_fast_streaming and len(text_content) > 3:
-                                    # BLAZING FAST mode: stream in LARGE batches
-                                    chunk_size = self.streaming_chunk_size
-                                    for i in range(0, len(text_content), chunk_size):
-                                        char_batch = text_content[i:i + chunk_size]
-                                        yield {
-                                            "type": "text",
-                                            "content": char_batch,
-                                            "timestamp": chunk_time  # SAME timestamp - NO delays!
-                                        }
-                                        # ABSOLUTELY NO delays - MAXIMUM SPEED!
-                                elif len(text_content) > 10:
-                                    words = text_content.split(' ')
-                                    for i, word in enumerate(words):
-                                        if word.strip():
-                                            yield {
-                                                "type": "text",
-                                                "content": word + (' ' if i < len(words) - 1 else ''),
-                                                "timestamp": chunk_time + (i * 0.001)
-                                            }
-                                else:
-                                    yield {
-                                        "type": "text",
-                                        "content": text_content,
-                                        "timestamp": chunk_time
-                                    }
-                    except Exception as parts_error:
-                        # Skip text if both methods fail
-                        pass
-                
-                # Handle function calls - check multiple possible attributes
-                function_calls = None
-                if hasattr(chunk, 'function_calls') and chunk.function_calls:
-                    function_calls = chunk.function_calls
-                elif hasattr(chunk, 'candidates') and chunk.candidates:
-                    # Check candidates for function calls
-                    for candidate in chunk.candidates:
-                        if hasattr(candidate, 'content') and candidate.content:
-                            if hasattr(candidate.content, 'parts'):
-                                for part in candidate.content.parts:
-                                    if hasattr(part, 'function_call') and part.function_call:
-                                        if not function_calls:
-                                            function_calls = []
-                                        function_calls.append(part.function_call)
+                if text_content:
+                    # One event per upstream chunk; the coalescer merges small ones
+                    yield {
+                        "type": "text",
+                        "content": text_content,
+                        "timestamp": chunk_time
+                    }
                 
                 if function_calls:
                     for call in function_calls:
-                        # Convert MapComposite to dict if needed
-                        args = call.args if hasattr(call, 'args') else {}
-                        if hasattr(args, 'items'):
-                            # Convert MapComposite to regular dict
-                            args = dict(args)
-                        
                         yield {
                             "type": "tool_call",
                             "name": call.name,
-                            "args": args,
+                            "args": _call_args(call),
                             "timestamp": chunk_time
                         }
                 
                 # Handle thinking content (if available)
-                if hasattr(chunk, 'thinking') and chunk.thinking:
+                if thinking:
                     yield {
                         "type": "thinking",
-                        "content": chunk.thinking,
+                        "content": thinking,
                         "timestamp": chunk_time
                     }
-                
-                # Yield control to allow other tasks
-                await asyncio.sleep(0)
-            
-            # Update performance metrics
-            total_time = time.time() - start_time
-            self.avg_response_time = (self.avg_response_time * (self.request_count - 1) + total_time) / self.request_count
+            finished = True
             
         except Exception as e:
+            # CancelledError (client gone) is not an Exception and propagates
             yield {
                 "type": "error",
                 "content": f"Gemini API error: {str(e)}",
                 "timestamp": time.time()
             }
+        finally:
+            # Abandoned or failed mid-stream: stop Gemini generating (and billing)
+            # tokens nobody will read
+            if response_stream is not None and not finished:
+                await _close_stream(response_stream)
+
+            # EWMA of response time, counting failed requests too; the first
+            # sample seeds it so early readings aren't pulled toward zero
+            total_time = time.time() - start_time
+            if self.request_count == 1:
+                self.avg_response_time = total_time
+            else:
+                self.avg_response_time = 0.1 * total_time + 0.9 * self.avg_response_time
     
     async def chat_simple_streaming(
         self, 
@@ -359,55 +613,18 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
         """Simple streaming chat for real-time token responses"""
         try:
             # Build conversation context for Gemini with system instructions
-            messages = []
-            
-            # Add system instructions as the first message
-            messages.append({"role": "user", "parts": [{"text": self.system_instructions}]})
-            messages.append({"role": "model", "parts": [{"text": "I understand. I am Iris, an autonomous AI agent with access to powerful tools. I will use them proactively to provide comprehensive assistance and solve problems systematically."}]})
+            messages = self._build_messages(message, thread_history)
             
-            # Add thread history
-            if thread_history:
-                for msg in thread_history:
-                    content = msg.get("content", "").strip()
-                    if content:  # Only add non-empty messages
-                        if msg["role"] == "user":
-                            messages.append({"role": "user", "parts": [{"text": content}]})
-                        elif msg["role"] == "assistant":
-                            messages.append({"role": "model", "parts": [{"text": content}]})
-            
-            # Add current message
-            messages.append({"role": "user", "parts": [{"text": message}]})
-            
-            # Generate streaming response
-            generation_config = {
-                "temperature": 0.7,
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-                "candidate_count": 1,
-                "stop_sequences": []
-            }
-            
-            safety_settings = {
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            }
-            
-            response = self.model.generate_content(
-                messages,
-                stream=True,
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
+            # Generate streaming response with the model's own config and safety settings
+            response = await self._generate(messages, stream=True)
             
             # Stream the response tokens
-            for chunk in response:
-                if chunk.text:
+            async for chunk in response:
+                text_content = _extract_text(chunk)
+                if text_content:
                     yield {
                         "type": "text",
-                        "content": chunk.text,
+                        "content": text_content,
                         "timestamp": time.time()
                     }
                     
@@ -424,41 +641,40 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
         thread_history: Optional[List[Dict[str, str]]] = None
     ) -> str:
         """Simple non-streaming chat for instant responses"""
+        cache_key = self._cache_key("simple", message, thread_history)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Concurrent identical prompts share one request; shield so a caller
+        # going away doesn't cancel it for the others
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._chat_simple_request(cache_key, message, thread_history))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        return await asyncio.shield(task)
+    
+    async def _chat_simple_request(
+        self,
+        cache_key: str,
+        message: str,
+        thread_history: Optional[List[Dict[str, str]]]
+    ) -> str:
         try:
             # Build conversation context for Gemini with system instructions
-            messages = []
-            
-            # Add system instructions as the first message
-            messages.append({"role": "user", "parts": [{"text": self.system_instructions}]})
-            messages.append({"role": "model", "parts": [{"text": "I understand. I am Iris, an autonomous AI agent with access to powerful tools. I will use them proactively to provide comprehensive assistance and solve problems systematically."}]})
+            messages = self._build_messages(message, thread_history)
             
-            # Add thread history
-            if thread_history:
-                for msg in thread_history:
-                    content = msg.get("content", "").strip()
-                    if content:  # Only add non-empty messages
-                        if msg["role"] == "user":
-                            messages.append({"role": "user", "parts": [{"text": content}]})
-                        elif msg["role"] == "assistant":
-                            messages.append({"role": "model", "parts": [{"text": content}]})
+            response = await self._generate(messages)
+            text_content = _extract_text(response)
             
-            # Add current user message (ensure it's not empty)
-            if message and message.strip():
-                messages.append({"role": "user", "parts": [{"text": message.strip()}]})
-            
-            response = await self.model.generate_content_async(messages)
-            try:
-                return response.text if response.text else "I'm ready to help!"
-            except Exception:
-                # If text access fails, try to get text from parts
-                if hasattr(response, 'parts') and response.parts:
-                    text_content = ""
-                    for part in response.parts:
-                        if hasattr(part, 'text') and part.text:
-                            text_content += part.text
-                    return text_content if text_content else "I'm ready to help!"
+            if not text_content:
                 return "I'm ready to help!"
+            self._cache_put(cache_key, text_content)
+            return text_content
             
+        except asyncio.TimeoutError:
+            return f"Error: Gemini request timed out after {self.request_timeout:g}s"
         except Exception as e:
             return f"Error: {str(e)}"
     
@@ -469,50 +685,25 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
         thread_history: Optional[List[Dict[str, str]]] = None
     ) -> Dict[str, Any]:
         """Synchronous chat with tools for instant responses"""
+        cache_key = self._cache_key("tools", message, thread_history, tools)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return {**cached, "timestamp": time.time()}
+        
         try:
             # Build conversation context for Gemini with system instructions
-            messages = []
-            
-            # Add system instructions as the first message
-            messages.append({"role": "user", "parts": [{"text": self.system_instructions}]})
-            messages.append({"role": "model", "parts": [{"text": "I understand. I am Iris, an autonomous AI agent with access to powerful tools. I will use them proactively to provide comprehensive assistance and solve problems systematically."}]})
-            
-            # Add thread history
-            if thread_history:
-                for msg in thread_history:
-                    content = msg.get("content", "").strip()
-                    if content:  # Only add non-empty messages
-                        if msg["role"] == "user":
-                            messages.append({"role": "user", "parts": [{"text": content}]})
-                        elif msg["role"] == "assistant":
-                            messages.append({"role": "model", "parts": [{"text": content}]})
-            
-            # Add current user message (ensure it's not empty)
-            if message and message.strip():
-                messages.append({"role": "user", "parts": [{"text": message.strip()}]})
+            messages = self._build_messages(message, thread_history)
             
             # Configure tools
-            tools_config = None
-            if tools:
-                function_declarations = self._build_function_declarations(tools)
-                if function_declarations:
-                    tools_config = [{"function_declarations": function_declarations}]
+            tools_config = self._get_tools_config(tools)
             
-            response = await self.model.generate_content_async(
+            response = await self._generate(
                 messages,
                 tools=tools_config
             )
             
             # Extract text content safely
-            text_content = ""
-            try:
-                text_content = response.text if response.text else ""
-            except Exception:
-                # If text access fails, try to get text from parts
-                if hasattr(response, 'parts') and response.parts:
-                    for part in response.parts:
-                        if hasattr(part, 'text') and part.text:
-                            text_content += part.text
+            text_content = _extract_text(response)
             
             result = {
                 "text": text_content,
@@ -521,15 +712,24 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
             }
             
             # Extract function calls
-            if hasattr(response, 'function_calls') and response.function_calls:
-                for call in response.function_calls:
-                    result["tool_calls"].append({
-                        "name": call.name,
-                        "args": call.args if hasattr(call, 'args') else {}
-                    })
+            for call in getattr(response, 'function_calls', None) or ():
+                result["tool_calls"].append({
+                    "name": call.name,
+                    "args": _call_args(call)
+                })
             
+            # Tool calls have side effects; only plain answers are replayed
+            if not result["tool_calls"]:
+                self._cache_put(cache_key, result)
             return result
             
+        except asyncio.TimeoutError:
+            return {
+                "text": f"Error: Gemini request timed out after {self.request_timeout:g}s",
+                "tool_calls": [],
+                "error": "timeout",
+                "timestamp": time.time()
+            }
         except Exception as e:
             return {
                 "text": f"Error: {str(e)}",
@@ -539,19 +739,21 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
     
     def get_performance_stats(self) -> Dict[str, Any]:
         """Get performance statistics"""
+        lookups = self.cache_hits + self.cache_misses
         return {
             "request_count": self.request_count,
             "total_tokens": self.total_tokens,
             "avg_response_time": round(self.avg_response_time, 3),
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else 0.0,
             "model_name": self.model_name,
             "thinking_budget": self.thinking_budget
         }
     
     def update_thinking_budget(self, budget: str):
         """Update thinking budget for cost/performance optimization"""
-        valid_budgets = ["low", "medium", "high"]
-        if budget in valid_budgets:
-            self.thinking_budget = budget
+        if budget not in _VALID_BUDGETS:
+            raise ValueError(f"Invalid thinking budget {budget!r}; expected one of {sorted(_VALID_BUDGETS)}")
+        self.thinking_budget = budget
     
     async def chat_next_turn(
         self, 
@@ -562,24 +764,7 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
         """Get next turn in conversation with optional tool results"""
         try:
             # Build conversation context
-            messages = []
-            
-            # Add system instructions
-            messages.append({"role": "user", "parts": [{"text": self.system_instructions}]})
-            messages.append({"role": "model", "parts": [{"text": "I understand. I am Iris, an autonomous AI agent with access to powerful tools. I will use them proactively to provide comprehensive assistance and solve problems systematically."}]})
-            
-            # Add conversation history
-            for msg in conversation_history:
-                content = msg.get("content", "").strip()
-                if content:
-                    if msg["role"] == "user":
-                        messages.append({"role": "user", "parts": [{"text": content}]})
-                    elif msg["role"] == "assistant":
-                        messages.append({"role": "model", "parts": [{"text": content}]})
-            
-            # Add current message
-            if message and message.strip():
-                messages.append({"role": "user", "parts": [{"text": message.strip()}]})
+            messages = self._build_messages(message, conversation_history)
             
             # Add tool results if provided
             if tool_results:
@@ -588,17 +773,10 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
                     tool_context += f"- {result.get('name', 'unknown')}: {result.get('result', {})}\n"
                 messages.append({"role": "user", "parts": [{"text": tool_context}]})
             
-            response = await self.model.generate_content_async(messages)
+            response = await self._generate(messages)
             
             # Extract text content safely
-            text_content = ""
-            try:
-                text_content = response.text if response.text else ""
-            except Exception:
-                if hasattr(response, 'parts') and response.parts:
-                    for part in response.parts:
-                        if hasattr(part, 'text') and part.text:
-                            text_content += part.text
+            text_content = _extract_text(response)
             
             result = {
                 "text": text_content,
@@ -607,15 +785,21 @@ Remember: You are an autonomous agent. Use your tools proactively to provide the
             }
             
             # Extract function calls if any
-            if hasattr(response, 'function_calls') and response.function_calls:
-                for call in response.function_calls:
-                    result["tool_calls"].append({
-                        "name": call.name,
-                        "args": call.args if hasattr(call, 'args') else {}
-                    })
+            for call in getattr(response, 'function_calls', None) or ():
+                result["tool_calls"].append({
+                    "name": call.name,
+                    "args": _call_args(call)
+                })
             
             return result
             
+        except asyncio.TimeoutError:
+            return {
+                "text": f"Error: Gemini request timed out after {self.request_timeout:g}s",
+                "tool_calls": [],
+                "error": "timeout",
+                "timestamp": time.time()
+            }
         except Exception as e:
             return {
                 "text": f"Error: {str(e)}",
@@ -640,7 +824,8 @@ Examples:
 
 Title:"""
 
-            response = await lite_model.generate_content_async(title_prompt)
+            async with asyncio.timeout(self.request_timeout):
+                response = await lite_model.generate_content_async(title_prompt)
             
             try:
                 title = response.text.strip() if response.text else "New Chat"
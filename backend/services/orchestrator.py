@@ -12,7 +12,7 @@ from services.gemini_client import get_gemini_client
 from services.tool_executor import get_tool_executor
 from tools import get_tool_schemas
 from models.agent import (
-    AgentEvent, ToolCallEvent, ToolResultEvent, TextEvent, 
+    AgentEvent, AGENT_EVENT_ADAPTER, ToolCallEvent, ToolResultEvent,
     ErrorEvent, EventType,
     OrchestratorConfig, ToolCall, ToolResult, ConversationTurn
 )
@@ -37,11 +37,8 @@ class TransparentOrchestrator:
     
     async def _emit_event(self, event: AgentEvent) -> Dict[str, Any]:
         """Convert event to dict for WebSocket emission"""
-        data = event.model_dump()
-        # Convert enum values to strings for JSON serialization
-        if 'type' in data and hasattr(data['type'], 'value'):
-            data['type'] = data['type'].value
-        return data
+        # JSON mode emits the enum "type" as its string value
+        return AGENT_EVENT_ADAPTER.dump_python(event, mode="json")
     
     async def _execute_tools_streaming(self, message: str, conversation_history: List[Union[ConversationTurn, Dict[str, Any]]]) -> AsyncGenerator[Dict[str, Any], None]:
         """Execute tool calls with streaming execution - tools run as they appear"""
@@ -78,19 +75,21 @@ Respond with specific tool calls needed to fulfill this request."""
                 if tool_hops >= self.config.max_tool_hops:
                     break
                     
-                if time.time() - start_time > self.config.max_execution_time:
+                # One clock read covers the budget check, the ID and the event ts
+                now = time.time()
+                if now - start_time > self.config.max_execution_time:
                     break
                 
                 tool_hops += 1
                 self.total_tool_hops += 1
                 
                 # Emit tool call event immediately
-                tool_call_id = f"tool_{int(time.time() * 1000)}"
+                tool_call_id = f"tool_{int(now * 1000)}"
                 yield await self._emit_event(ToolCallEvent(
                     name=chunk["name"],
                     args=chunk["args"],
                     id=tool_call_id,
-                    ts=time.time()
+                    ts=now
                 ))
                 
                 # Execute tool in parallel task
@@ -184,19 +183,23 @@ Provide a helpful response with proper markdown formatting."""
             self.tools
         ):
             if chunk["type"] == "text":
-                # Emit each token immediately for instant streaming
-                yield await self._emit_event(TextEvent(
-                    content=chunk["content"],
-                    ts=chunk["timestamp"]
-                ))
+                # Emit each token immediately for instant streaming.
+                # Text is the hottest event, so its TextEvent-shaped dict is
+                # built directly instead of via a model instance.
+                yield {
+                    "type": EventType.TEXT.value,
+                    "content": chunk["content"],
+                    "ts": chunk["timestamp"]
+                }
             elif chunk["type"] == "tool_call":
                 # Execute tool immediately and stream results
-                tool_call_id = f"tool_{int(time.time() * 1000)}"
+                now = time.time()
+                tool_call_id = f"tool_{int(now * 1000)}"
                 yield await self._emit_event(ToolCallEvent(
                     name=chunk["name"],
                     args=chunk["args"],
                     id=tool_call_id,
-                    ts=time.time()
+                    ts=now
                 ))
                 
                 # Execute tool and stream result
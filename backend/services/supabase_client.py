@@ -104,3 +104,11 @@ def get_db_connection() -> DBConnection:
     if _db_connection is None:
         _db_connection = DBConnection()
     return _db_connection
+
+async def get_app_client(app) -> AsyncClient:
+    """Get the Supabase client cached on app.state, resolving it once if startup could not"""
+    client = getattr(app.state, "supabase", None)
+    if client is None:
+        client = await get_db_connection().client
+        app.state.supabase = client
+    return client
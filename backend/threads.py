@@ -10,7 +10,7 @@ from fastapi import APIRouter, HTTPException, Depends, Form, Query, Request
 from pydantic import BaseModel
 
 from utils.auth_utils import verify_and_get_user_id_from_jwt, verify_and_authorize_thread_access
-from services.supabase_client import get_db_connection
+from services.supabase_client import get_app_client
 
 router = APIRouter()
 
@@ -37,8 +37,7 @@ async def get_user_threads(
 ):
     """Get all threads for the current user with associated project data."""
     print(f"Fetching threads for user: {user_id} (page={page}, limit={limit})")
-    db = get_db_connection()
-    client = await db.client
+    client = await get_app_client(request.app)
     # Use user's JWT for RLS-authenticated queries if available
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
@@ -142,8 +141,7 @@ async def get_thread(
 ):
     """Get a specific thread by ID with complete related data."""
     print(f"Fetching thread: {thread_id}")
-    db = get_db_connection()
-    client = await db.client
+    client = await get_app_client(request.app)
     # Use user's JWT for RLS-authenticated queries if available
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
@@ -233,8 +231,7 @@ async def create_thread(
         print(f"🔓 Authentication failed, creating anonymous thread: {e}")
         user_id = None
     
-    db = get_db_connection()
-    client = await db.client
+    client = await get_app_client(request.app)
     # Use user's JWT for RLS-authenticated queries if available
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
@@ -294,8 +291,7 @@ async def get_thread_messages(
 ):
     """Get all messages for a thread."""
     print(f"Fetching all messages for thread: {thread_id}, order={order}")
-    db = get_db_connection()
-    client = await db.client
+    client = await get_app_client(request.app)
     # Use user's JWT for RLS-authenticated queries if available
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
@@ -334,8 +330,7 @@ async def create_message(
 ):
     """Create a new message in a thread."""
     print(f"Creating message in thread: {thread_id}")
-    db = get_db_connection()
-    client = await db.client
+    client = await get_app_client(request.app)
     # Use user's JWT for RLS-authenticated queries if available
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
@@ -383,8 +378,7 @@ async def sync_local_chats(
 ):
     """Sync local chats to cloud storage."""
     print(f"Syncing {len(sync_data.messages)} messages for user: {user_id}")
-    db = get_db_connection()
-    client = await db.client
+    client = await get_app_client(request.app)
     # Use user's JWT for RLS-authenticated queries if available
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
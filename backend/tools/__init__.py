@@ -490,9 +490,15 @@ TOOLS = {
     "computer": ComputerTool()
 }
 
+# Schemas are static per registry, so they are built on first use and shared
+_TOOL_SCHEMAS: Optional[list] = None
+
 def get_tool_schemas() -> list:
-    """Get tool schemas for LLM function calling"""
-    return [tool.get_schema() for tool in TOOLS.values()]
+    """Get tool schemas for LLM function calling (shared list; do not mutate)"""
+    global _TOOL_SCHEMAS
+    if _TOOL_SCHEMAS is None:
+        _TOOL_SCHEMAS = [tool.get_schema() for tool in TOOLS.values()]
+    return _TOOL_SCHEMAS
 
 async def execute_tool(tool_name: str, **kwargs) -> Dict[str, Any]:
     """Execute a tool by name with instant response"""
@@ -8,6 +8,25 @@ from typing import Optional, Dict, Any
 from fastapi import Request, HTTPException
 from services.supabase_client import get_db_connection
 
+def decode_jwt_claims(token: str) -> Dict[str, Any]:
+    """
+    Decode JWT claims and require a user ID.
+    Following Supabase pattern - no signature verification needed, so this is
+    pure CPU work in the microsecond range and safe to run on the event loop.
+    If signature verification is ever enabled, call this via run_in_threadpool.
+    """
+    try:
+        # Decode JWT without verification (Supabase pattern)
+        # In production, you might want to verify the signature
+        decoded_token = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+    
+    if not decoded_token.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
+    
+    return decoded_token
+
 async def verify_and_get_user_id_from_jwt(request: Request) -> str:
     """
     Verify JWT token and extract user ID.
@@ -22,19 +41,10 @@ async def verify_and_get_user_id_from_jwt(request: Request) -> str:
         # Extract token
         token = auth_header.split(" ")[1]
         
-        # Decode JWT without verification (Supabase pattern)
-        # In production, you might want to verify the signature
-        decoded_token = jwt.decode(token, options={"verify_signature": False})
-        
-        # Extract user ID
-        user_id = decoded_token.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
-        
-        return user_id
+        return decode_jwt_claims(token)["sub"]
         
-    except jwt.InvalidTokenError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Authentication error: {str(e)}")
 
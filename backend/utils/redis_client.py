@@ -5,6 +5,7 @@ Ultra-fast Redis operations for job management and real-time events
 
 import os
 import json
+import asyncio
 import time
 import uuid
 from typing import Dict, Any, List, Optional, AsyncGenerator
@@ -12,6 +13,14 @@ from enum import Enum
 import redis.asyncio as redis
 from redis.asyncio import Redis
 
+# Compare-and-delete, so an expired lock that another caller has since taken is left alone
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
 
 class JobStatus(Enum):
     """Job status enumeration"""
@@ -34,6 +43,7 @@ class RedisClient:
         self.job_ttl = int(os.getenv("JOB_TTL", "3600"))  # 1 hour default
         self.event_ttl = int(os.getenv("EVENT_TTL", "1800"))  # 30 minutes default
         self.max_events_per_job = int(os.getenv("MAX_EVENTS_PER_JOB", "1000"))
+        self.event_stream_block_ms = int(os.getenv("EVENT_STREAM_BLOCK_MS", "5000"))
         
         # Performance tracking
         self.operations_count = 0
@@ -87,27 +97,70 @@ class RedisClient:
             "metadata": metadata or {}
         }
         
-        # Store job data
-        await self.client.setex(
-            f"job:{job_id}",
-            self.job_ttl,
-            json.dumps(job_data)
-        )
-        
-        # Add to job queue
-        await self.client.lpush(f"job_queue:{priority}", job_id)
-        
-        # Initialize events list
-        await self.client.lpush(f"job:{job_id}:events", json.dumps({
+        created_event = {
             "type": "created",
             "message": f"Job {job_type} created",
             "timestamp": time.time(),
             "metadata": {"priority": priority}
-        }))
+        }
+        
+        # Store job, enqueue it and initialize its events in one round-trip
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.setex(f"job:{job_id}", self.job_ttl, json.dumps(job_data))
+            pipe.lpush(f"job_queue:{priority}", job_id)
+            self._queue_event(pipe, job_id, created_event)
+            await pipe.execute()
         
         self.operations_count += 1
         return job_id
     
+    async def create_jobs(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        """Create several jobs in one round-trip and return their IDs in order
+        
+        Each item has "job_type" and "parameters", plus optional "priority"
+        and "metadata" as in create_job.
+        """
+        await self._ensure_connected()
+        
+        now = time.time()
+        job_ids: List[str] = []
+        queues: Dict[str, List[str]] = {}
+        
+        async with self.client.pipeline(transaction=True) as pipe:
+            for job in jobs:
+                job_id = str(uuid.uuid4())
+                job_type = job["job_type"]
+                priority = job.get("priority", "normal")
+                job_data = {
+                    "id": job_id,
+                    "type": job_type,
+                    "parameters": job["parameters"],
+                    "priority": priority,
+                    "status": JobStatus.PENDING.value,
+                    "created_at": now,
+                    "updated_at": now,
+                    "metadata": job.get("metadata") or {}
+                }
+                pipe.setex(f"job:{job_id}", self.job_ttl, json.dumps(job_data))
+                self._queue_event(pipe, job_id, {
+                    "type": "created",
+                    "message": f"Job {job_type} created",
+                    "timestamp": now,
+                    "metadata": {"priority": priority}
+                })
+                queues.setdefault(priority, []).append(job_id)
+                job_ids.append(job_id)
+            
+            # One variadic LPUSH per priority queue
+            for priority, queued_ids in queues.items():
+                pipe.lpush(f"job_queue:{priority}", *queued_ids)
+            
+            if job_ids:
+                await pipe.execute()
+        
+        self.operations_count += len(job_ids)
+        return job_ids
+    
     async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get job data by ID"""
         await self._ensure_connected()
@@ -172,18 +225,28 @@ class RedisClient:
             "data": data or {}
         }
         
-        # Add event to job timeline
-        await self.client.lpush(f"job:{job_id}:events", json.dumps(event))
-        
-        # Trim events list to max size
-        await self.client.ltrim(f"job:{job_id}:events", 0, self.max_events_per_job - 1)
-        
-        # Set TTL for events
-        await self.client.expire(f"job:{job_id}:events", self.event_ttl)
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._queue_event(pipe, job_id, event)
+            await pipe.execute()
         
         self.operations_count += 1
         return True
     
+    def _queue_event(self, pipe, job_id: str, event: Dict[str, Any]):
+        """Queue the commands that record a job event onto a pipeline"""
+        payload = json.dumps(event)
+        events_key = f"job:{job_id}:events"
+        stream_key = f"job:{job_id}:stream"
+        
+        # Job timeline, trimmed to max size
+        pipe.lpush(events_key, payload)
+        pipe.ltrim(events_key, 0, self.max_events_per_job - 1)
+        pipe.expire(events_key, self.event_ttl)
+        
+        # Stream entry so readers are woken immediately
+        pipe.xadd(stream_key, {"event": payload}, maxlen=self.max_events_per_job, approximate=True)
+        pipe.expire(stream_key, self.event_ttl)
+    
     async def get_job_events(
         self, 
         job_id: str, 
@@ -210,6 +273,34 @@ class RedisClient:
         """Stream job events in real-time"""
         await self._ensure_connected()
         
+        stream_key = f"job:{job_id}:stream"
+        if not await self.client.exists(stream_key):
+            # Jobs created before events were mirrored to a stream
+            async for event in self._poll_job_events(job_id):
+                yield event
+            return
+        
+        # Replay from the start of the stream, then block for new entries
+        last_id = "0-0"
+        while True:
+            response = await self.client.xread(
+                {stream_key: last_id},
+                count=100,
+                block=self.event_stream_block_ms
+            )
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    try:
+                        yield json.loads(fields[b"event"])
+                    except (KeyError, json.JSONDecodeError):
+                        continue
+    
+    async def _poll_job_events(
+        self, 
+        job_id: str
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Poll the job events list (fallback for jobs without a stream)"""
         # Get initial events
         events = await self.get_job_events(job_id)
         for event in reversed(events):  # Send oldest first
@@ -292,6 +383,29 @@ class RedisClient:
             self.cache_misses += 1
             return None
     
+    async def acquire_lock(self, key: str, ttl_ms: int) -> Optional[str]:
+        """Take a short-lived SET NX PX lock; the owner token if this caller now holds it
+        
+        Redis errors count as acquired so callers fall back to doing the work.
+        """
+        await self._ensure_connected()
+        
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.client.set(key, token, nx=True, px=ttl_ms)
+            self.operations_count += 1
+            return token if acquired else None
+        except Exception:
+            return token
+    
+    async def release_lock(self, key: str, token: str) -> None:
+        """Release a lock taken with acquire_lock, only if this caller still owns it"""
+        try:
+            await self.client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token)
+            self.operations_count += 1
+        except Exception:
+            pass
+    
     async def cache_delete(self, key: str) -> bool:
         """Delete cache value"""
         await self._ensure_connected()
@@ -247,151 +247,155 @@ export function IrisChat({ chatId }: IrisChatProps) {
               return;
             }
             
-            const data = JSON.parse(event.data);
-            console.log("🔍 Parsed WebSocket message:", data);
-            
-            if (data.type === "tool_call") {
-              const toolCall: ToolCall = {
-                id: data.id,
-                name: data.name,
-                status: 'running',
-                cached: data.cached || false
-              };
-              setActiveToolCalls(prev => new Map(prev).set(data.id, toolCall));
-              
-              // Mark that we've received a response (agent is working)
-              if (!hasReceivedResponse) {
-                setHasReceivedResponse(true);
-                setIsLoading(false); // Hide thinking indicator
-              }
-              
-              // Add to toolCalls array for ComputerView
-              const toolCallViewModel: ToolCallViewModel = {
-                id: data.id,
-                name: data.name,
-                args: data.args || {},
-                status: 'running',
-                startTime: data.ts || Date.now()
-              };
-              setToolCalls(prev => [...prev, toolCallViewModel]);
+            const frame = JSON.parse(event.data);
+            console.log("🔍 Parsed WebSocket message:", frame);
+
+            // Batched frames carry several events; replay them in order
+            const frameEvents = frame.type === "batch" ? frame.events : [frame];
+            for (const data of frameEvents) {
+              if (data.type === "tool_call") {
+                const toolCall: ToolCall = {
+                  id: data.id,
+                  name: data.name,
+                  status: 'running',
+                  cached: data.cached || false
+                };
+                setActiveToolCalls(prev => new Map(prev).set(data.id, toolCall));
               
-              // Auto-open Computer View on first tool call
-              if (toolCalls.length === 0) {
-                setShowComputerView(true);
-              }
+                // Mark that we've received a response (agent is working)
+                if (!hasReceivedResponse) {
+                  setHasReceivedResponse(true);
+                  setIsLoading(false); // Hide thinking indicator
+                }
               
-              // Add compact tool call chip instead of system message
-              // Tool calls will be displayed as chips in the UI, not as messages
+                // Add to toolCalls array for ComputerView
+                const toolCallViewModel: ToolCallViewModel = {
+                  id: data.id,
+                  name: data.name,
+                  args: data.args || {},
+                  status: 'running',
+                  startTime: data.ts || Date.now()
+                };
+                setToolCalls(prev => [...prev, toolCallViewModel]);
               
-            } else if (data.type === "tool_result") {
-              setActiveToolCalls(prev => {
-                const newMap = new Map(prev);
-                const existing = newMap.get(data.id);
-                if (existing) {
-                  newMap.set(data.id, { ...existing, status: data.success ? 'completed' : 'error' });
+                // Auto-open Computer View on first tool call
+                if (toolCalls.length === 0) {
+                  setShowComputerView(true);
                 }
-                return newMap;
-              });
-              
-              // Update toolCalls array for ComputerView
-              setToolCalls(prev => prev.map(tool => 
-                tool.id === data.id 
-                  ? { 
-                      ...tool, 
-                      status: data.success ? 'completed' : 'error',
-                      success: data.success,
-                      cached: data.cached,
-                      output: JSON.stringify(data.result)
-                    }
-                  : tool
-              ));
               
-              // Tool results will be displayed as updated chips, not as system messages
+                // Add compact tool call chip instead of system message
+                // Tool calls will be displayed as chips in the UI, not as messages
               
-              // Remove completed tool calls after a delay
-              setTimeout(() => {
+              } else if (data.type === "tool_result") {
                 setActiveToolCalls(prev => {
                   const newMap = new Map(prev);
-                  newMap.delete(data.id);
+                  const existing = newMap.get(data.id);
+                  if (existing) {
+                    newMap.set(data.id, { ...existing, status: data.success ? 'completed' : 'error' });
+                  }
                   return newMap;
                 });
-              }, 3000);
               
-            } else if (data.type === "text") {
-              console.log("📝 Received text token:", data.content);
+                // Update toolCalls array for ComputerView
+                setToolCalls(prev => prev.map(tool => 
+                  tool.id === data.id 
+                    ? { 
+                        ...tool, 
+                        status: data.success ? 'completed' : 'error',
+                        success: data.success,
+                        cached: data.cached,
+                        output: JSON.stringify(data.result)
+                      }
+                    : tool
+                ));
               
-              // Mark that we've received a response
-              if (!hasReceivedResponse) {
-                setHasReceivedResponse(true);
-                setIsLoading(false); // Hide thinking indicator
-                setIsStreaming(true); // Start streaming mode
-                setStreamingTextContent(""); // Reset streaming content
-                
-                // Create initial assistant message
-                const lastMessage = messages[messages.length - 1];
-                if (!lastMessage || lastMessage.role === "user") {
-                  await addMessageSafely({
-                    role: "assistant",
-                    content: data.content, // Start with the first token
+                // Tool results will be displayed as updated chips, not as system messages
+              
+                // Remove completed tool calls after a delay
+                setTimeout(() => {
+                  setActiveToolCalls(prev => {
+                    const newMap = new Map(prev);
+                    newMap.delete(data.id);
+                    return newMap;
                   });
+                }, 3000);
+              
+              } else if (data.type === "text") {
+                console.log("📝 Received text token:", data.content);
+              
+                // Mark that we've received a response
+                if (!hasReceivedResponse) {
+                  setHasReceivedResponse(true);
+                  setIsLoading(false); // Hide thinking indicator
+                  setIsStreaming(true); // Start streaming mode
+                  setStreamingTextContent(""); // Reset streaming content
+                
+                  // Create initial assistant message
+                  const lastMessage = messages[messages.length - 1];
+                  if (!lastMessage || lastMessage.role === "user") {
+                    await addMessageSafely({
+                      role: "assistant",
+                      content: data.content, // Start with the first token
+                    });
+                  }
+                } else {
+                  // Update the last assistant message with new content
+                  const lastMessage = messages[messages.length - 1];
+                  if (lastMessage && lastMessage.role === "assistant") {
+                    // For streaming updates, we need to handle this differently
+                    // This is a simplified approach - in a real implementation,
+                    // you'd want to handle streaming updates more elegantly
+                    console.log("📝 Streaming update:", data.content);
+                  }
                 }
-              } else {
-                // Update the last assistant message with new content
-                const lastMessage = messages[messages.length - 1];
-                if (lastMessage && lastMessage.role === "assistant") {
-                  // For streaming updates, we need to handle this differently
-                  // This is a simplified approach - in a real implementation,
-                  // you'd want to handle streaming updates more elegantly
-                  console.log("📝 Streaming update:", data.content);
-                }
-              }
               
-              // Clear existing finalize timeout
-              if (finalizeTimeoutRef.current) {
-                clearTimeout(finalizeTimeoutRef.current);
-              }
+                // Clear existing finalize timeout
+                if (finalizeTimeoutRef.current) {
+                  clearTimeout(finalizeTimeoutRef.current);
+                }
               
-              // Set new timeout to finalize message (200ms after last token)
-              finalizeTimeoutRef.current = setTimeout(() => {
-                setIsStreaming(false);
-                finalizeTimeoutRef.current = null;
-              }, 200);
+                // Set new timeout to finalize message (200ms after last token)
+                finalizeTimeoutRef.current = setTimeout(() => {
+                  setIsStreaming(false);
+                  finalizeTimeoutRef.current = null;
+                }, 200);
               
-            } else if (data.type === "deliver") {
-              setDeliveredArtifacts(data.artifacts || []);
+              } else if (data.type === "deliver") {
+                setDeliveredArtifacts(data.artifacts || []);
               
-              // Add system message for delivery
-              await addMessageSafely({
-                role: "system",
-                content: `📦 Delivered ${data.artifacts?.length || 0} file(s): ${data.summary || 'Files created'}`,
-              });
-              console.log("📝 Added deliver message");
-            } else if (data.type === "ack") {
-              console.log("✅ Received acknowledgment");
-            } else if (data.type === "error") {
-              console.log("❌ Received error:", data.content);
-            } else if (data.type === "file_upload_success") {
-              console.log("✅ File uploaded successfully:", data);
-              // Show subtle notification, no tool call chip
-              // File is now available in sandbox for agent to use
-            } else if (data.type === "file_upload_error") {
-              console.error("❌ File upload failed:", data);
-              // Show error notification
-            } else if (data.type === "file_download_success") {
-              console.log("✅ File downloaded successfully:", data);
-              // Trigger file download in browser
-              downloadFile(data.file_name, data.content);
-            } else if (data.type === "file_download_error") {
-              console.error("❌ File download failed:", data);
-              // Show error notification
-            } else if (data.type === "list_files_success") {
-              console.log("📁 Files listed successfully:", data);
-              // Update file list in UI if needed
-            } else if (data.type === "list_files_error") {
-              console.error("❌ List files failed:", data);
-              // Show error notification
-            } else {
-              console.log("❓ Unknown message type:", data.type);
+                // Add system message for delivery
+                await addMessageSafely({
+                  role: "system",
+                  content: `📦 Delivered ${data.artifacts?.length || 0} file(s): ${data.summary || 'Files created'}`,
+                });
+                console.log("📝 Added deliver message");
+              } else if (data.type === "ack") {
+                console.log("✅ Received acknowledgment");
+              } else if (data.type === "error") {
+                console.log("❌ Received error:", data.content);
+              } else if (data.type === "file_upload_success") {
+                console.log("✅ File uploaded successfully:", data);
+                // Show subtle notification, no tool call chip
+                // File is now available in sandbox for agent to use
+              } else if (data.type === "file_upload_error") {
+                console.error("❌ File upload failed:", data);
+                // Show error notification
+              } else if (data.type === "file_download_success") {
+                console.log("✅ File downloaded successfully:", data);
+                // Trigger file download in browser
+                downloadFile(data.file_name, data.content);
+              } else if (data.type === "file_download_error") {
+                console.error("❌ File download failed:", data);
+                // Show error notification
+              } else if (data.type === "list_files_success") {
+                console.log("📁 Files listed successfully:", data);
+                // Update file list in UI if needed
+              } else if (data.type === "list_files_error") {
+                console.error("❌ List files failed:", data);
+                // Show error notification
+              } else {
+                console.log("❓ Unknown message type:", data.type);
+              }
             }
           } catch (error) {
             console.error("❌ Error parsing WebSocket message:", error);
@@ -497,59 +501,63 @@ export function IrisChat({ chatId }: IrisChatProps) {
           console.log("🔍 Data type:", typeof event.data);
           console.log("🔍 Data length:", event.data.length);
           
-          const data = JSON.parse(event.data);
-          console.log("📥 Parsed WebSocket data:", data);
-          
-          if (data.type === "text") {
-            console.log("📝 Received text token:", data.content);
+          const frame = JSON.parse(event.data);
+          console.log("📥 Parsed WebSocket data:", frame);
 
-            if (!hasReceivedResponse) {
-              setHasReceivedResponse(true);
-              setIsLoading(false); // Hide thinking indicator
-              setIsStreaming(true); // Start streaming mode
+          // Batched frames carry several events; replay them in order
+          const frameEvents = frame.type === "batch" ? frame.events : [frame];
+          for (const data of frameEvents) {
+            if (data.type === "text") {
+              console.log("📝 Received text token:", data.content);
 
-              // Create initial assistant message if the last message is not an assistant message
-              const lastMessage = messages[messages.length - 1];
-              if (!lastMessage || lastMessage.role === "user") {
-                await addMessageSafely({
-                  role: "assistant",
-                  content: "",
-                });
+              if (!hasReceivedResponse) {
+                setHasReceivedResponse(true);
+                setIsLoading(false); // Hide thinking indicator
+                setIsStreaming(true); // Start streaming mode
+
+                // Create initial assistant message if the last message is not an assistant message
+                const lastMessage = messages[messages.length - 1];
+                if (!lastMessage || lastMessage.role === "user") {
+                  await addMessageSafely({
+                    role: "assistant",
+                    content: "",
+                  });
+                }
               }
-            }
 
-            // Update the content of the last assistant message
-            // For streaming updates, we need to handle this differently
-            // This is a simplified approach - in a real implementation,
-            // you'd want to handle streaming updates more elegantly
-            console.log("📝 Streaming update:", data.content);
+              // Update the content of the last assistant message
+              // For streaming updates, we need to handle this differently
+              // This is a simplified approach - in a real implementation,
+              // you'd want to handle streaming updates more elegantly
+              console.log("📝 Streaming update:", data.content);
 
-            // Clear existing finalize timeout
-            if (finalizeTimeoutRef.current) {
-              clearTimeout(finalizeTimeoutRef.current);
-            }
+              // Clear existing finalize timeout
+              if (finalizeTimeoutRef.current) {
+                clearTimeout(finalizeTimeoutRef.current);
+              }
 
-            // Set new timeout to finalize message (200ms after last token)
-            finalizeTimeoutRef.current = setTimeout(() => {
-              setIsStreaming(false);
-              finalizeTimeoutRef.current = null;
-            }, 200);
+              // Set new timeout to finalize message (200ms after last token)
+              finalizeTimeoutRef.current = setTimeout(() => {
+                setIsStreaming(false);
+                finalizeTimeoutRef.current = null;
+              }, 200);
 
-          } else if (data.type === "deliver") {
-            setDeliveredArtifacts(data.artifacts || []);
+            } else if (data.type === "deliver") {
+              setDeliveredArtifacts(data.artifacts || []);
 
-            // Add system message for delivery
-            await addMessageSafely({
-              role: "system",
-              content: `📦 Delivered ${data.artifacts?.length || 0} file(s): ${data.summary || 'Files created'}`,
-            });
-            setIsStreaming(false); // Ensure streaming is off after delivery
-          } else if (data.type === "end") {
-            console.log("🏁 Received end signal");
-            setIsStreaming(false);
-            if (finalizeTimeoutRef.current) {
-              clearTimeout(finalizeTimeoutRef.current);
-              finalizeTimeoutRef.current = null;
+              // Add system message for delivery
+              await addMessageSafely({
+                role: "system",
+                content: `📦 Delivered ${data.artifacts?.length || 0} file(s): ${data.summary || 'Files created'}`,
+              });
+              setIsStreaming(false); // Ensure streaming is off after delivery
+            } else if (data.type === "end") {
+              console.log("🏁 Received end signal");
+              setIsStreaming(false);
+              if (finalizeTimeoutRef.current) {
+                clearTimeout(finalizeTimeoutRef.current);
+                finalizeTimeoutRef.current = null;
+              }
             }
           }
         } catch (error) {